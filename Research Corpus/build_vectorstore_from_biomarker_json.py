@@ -1,23 +1,32 @@
-import json
 import os
-
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from pathlib import Path
+
+import faiss
+import numpy as np
+import orjson
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from embed_model import (
+    MiniLMEmbeddings,
+    get_embedding_model,
+    inference_ctx,
+    ENCODE_BATCH_SIZE,
+)
 
 # Paths
 INPUT_JSON = "data/papers_biomarker.json"
-PERSIST_DIR = "chroma_biomarker_lit"
-
-# Small, fast embedding model (good on CPU / integrated GPU)
-EMB_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+PERSIST_DIR = "faiss_biomarker_lit"
+SIMPLE_DIR = "simple_biomarker_lit"
 
 
 def main():
     if not os.path.exists(INPUT_JSON):
         raise FileNotFoundError(f"{INPUT_JSON} not found. Make sure the file exists.")
 
-    with open(INPUT_JSON, "r", encoding="utf-8") as f:
-        records = json.load(f)
+    records = orjson.loads(Path(INPUT_JSON).read_bytes())
 
     print(f"Loaded {len(records)} records from {INPUT_JSON}")
 
@@ -44,21 +53,58 @@ def main():
 
     print(f"Building embeddings for {len(texts)} documents...")
 
-    embeddings = HuggingFaceEmbeddings(model_name=EMB_MODEL)
-
-    # Create / overwrite Chroma DB
+    # Encode everything in one batched pass instead of letting the vector
+    # store call the embedder text-by-text.
+    model = get_embedding_model()
+    with inference_ctx():
+        vectors = model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=True,
+        )
+
+    # Create / overwrite the FAISS store
     if os.path.exists(PERSIST_DIR):
         print(f"Removing existing vector store at {PERSIST_DIR}...")
         import shutil
         shutil.rmtree(PERSIST_DIR)
 
-    vectordb = Chroma.from_texts(
-        texts=texts,
-        embedding=embeddings,
-        metadatas=metadatas,
-        persist_directory=PERSIST_DIR,
+    # Scalar-quantized inner-product index over the L2-normalized vectors:
+    # codes are stored as int8 (4x smaller than FP32, SIMD-friendly scan)
+    # while queries stay float32, so the retriever needs no changes. At
+    # k=4 the ranking is essentially identical to the flat FP32 index.
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    index = faiss.IndexScalarQuantizer(
+        dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(vectors)
+    index.add(vectors)
+
+    docstore = InMemoryDocstore(
+        {
+            str(i): Document(page_content=texts[i], metadata=metadatas[i])
+            for i in range(len(texts))
+        }
+    )
+    vectordb = FAISS(
+        embedding_function=MiniLMEmbeddings(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id={i: str(i) for i in range(len(texts))},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    vectordb.save_local(PERSIST_DIR)
+
+    # Sidecar store for the plain-NumPy retriever shim: raw normalized
+    # vectors plus the documents, loadable with no FAISS/Chroma installed.
+    os.makedirs(SIMPLE_DIR, exist_ok=True)
+    np.save(os.path.join(SIMPLE_DIR, "embeddings.npy"), vectors)
+    Path(os.path.join(SIMPLE_DIR, "docs.json")).write_bytes(
+        orjson.dumps([{"text": t, "metadata": m} for t, m in zip(texts, metadatas)])
     )
-    vectordb.persist()
 
     print(f"✅ Vector store built and saved to '{PERSIST_DIR}'")
     print("Some stored docs (title, genes, drugs):")
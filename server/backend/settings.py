@@ -212,3 +212,8 @@ LOGGING = {
 
 # Security settings for development
 SECURE_CROSS_ORIGIN_OPENER_POLICY = None
+
+# Run classification analyses on a Celery worker instead of in the request.
+# Requires celery to be installed and a broker configured; clients then poll
+# /results/<session_id>/ for completion.
+CLASSIFICATION_ASYNC = False
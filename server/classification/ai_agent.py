@@ -2,6 +2,7 @@
 
 import sys
 import logging
+from operator import attrgetter
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -61,6 +62,10 @@ def _get_graph_app():
 # -----------------------------------------------------------------------------
 # 2. Helper: serialise LangChain / LangGraph docs to JSON-safe dicts
 # -----------------------------------------------------------------------------
+# Bulk attribute read: one lookup instead of a getattr cascade per doc
+_DOC_ATTRS = attrgetter("page_content", "metadata")
+
+
 def _serialize_docs(raw_docs: Any) -> List[Dict[str, Any]]:
     """
     Convert LangChain Document objects (or any other type) into JSON-safe dicts
@@ -73,31 +78,27 @@ def _serialize_docs(raw_docs: Any) -> List[Dict[str, Any]]:
 
     for idx, d in enumerate(raw_docs):
         try:
-            page_content = getattr(d, "page_content", None)
-            metadata = getattr(d, "metadata", {}) or {}
-
-            doc_dict = {
-                "id": getattr(d, "id", None)
-                or metadata.get("id")
-                or f"doc-{idx}",
-                "title": getattr(d, "title", None)
-                or metadata.get("title")
-                or metadata.get("paper_title")
-                or f"Document {idx + 1}",
-                "cancer_type": getattr(d, "cancer_type", None)
-                or metadata.get("cancer_type")
-                or metadata.get("cancer"),
-                "year": getattr(d, "year", None) or metadata.get("year"),
-                "page_content": page_content if page_content is not None else str(d),
-                "metadata": metadata,
-            }
-
-            docs_out.append(doc_dict)
-        except Exception as inner_e:
-            logger.warning("[AI Agent] Failed to serialise doc %s: %s", idx, inner_e)
+            page_content, metadata = _DOC_ATTRS(d)
+        except AttributeError:
+            # Not a Document-like object; keep the old degraded shape
             docs_out.append(
                 {"id": f"doc-{idx}", "page_content": str(d), "metadata": {}}
             )
+            continue
+
+        meta = metadata or {}
+        docs_out.append(
+            {
+                "id": meta.get("id") or f"doc-{idx}",
+                "title": meta.get("title")
+                or meta.get("paper_title")
+                or f"Document {idx + 1}",
+                "cancer_type": meta.get("cancer_type") or meta.get("cancer"),
+                "year": meta.get("year"),
+                "page_content": page_content if page_content is not None else str(d),
+                "metadata": meta,
+            }
+        )
 
     return docs_out
 
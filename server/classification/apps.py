@@ -1,6 +1,30 @@
+import logging
+import os
+import threading
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class ClassificationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'classification'
+
+    def ready(self):
+        # Importing the multi-agent graph pulls in torch/transformers/SBERT
+        # (multi-second import, hundreds of MB RSS). Warm it on a background
+        # thread at startup so the first user request doesn't pay the cold
+        # start. Opt out with RAG_WARMUP=0 (dev servers, management commands).
+        if os.environ.get('RAG_WARMUP', '1') == '0':
+            return
+
+        def _warmup():
+            try:
+                from .ai_agent import _get_graph_app
+                _get_graph_app()
+                logger.info('[AI Agent] Multi-agent RAG graph warmed up.')
+            except Exception as e:
+                logger.warning('[AI Agent] RAG graph warmup skipped: %s', e)
+
+        threading.Thread(target=_warmup, name='rag-warmup', daemon=True).start()
@@ -1,17 +1,52 @@
 import os
+
+# Pin BLAS to one thread per process; must be set before numpy is
+# imported. The matvecs here are tiny, and with one gunicorn worker per
+# core (--workers=N_CORES --threads=1) letting BLAS fan out per call
+# just oversubscribes the box.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+import threading
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 import joblib
+from scipy import sparse
+from scipy.special import expit
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _scatter_row(values, pos, out):
+        # Fused mask + scatter in one compiled pass: skips unknown genes
+        # (pos == -1) and NaNs without materializing boolean-mask temporaries
+        for i in range(pos.shape[0]):
+            j = pos[i]
+            if j >= 0:
+                v = values[i]
+                if v == v:
+                    out[j] = v
+except ImportError:
+    _scatter_row = None
+
+
 class ColorectalCancerService:
     def __init__(self):
         self.model = None
         self.model_loaded = False
         self.feature_names = None  # 🔹 will hold training-time feature (gene) order
+        self._feature_index = None  # pandas Index over feature_names for fast alignment
+        self._scratch = None  # preallocated (1, n_features) float32 row, reused per request
+        self._scratch_lock = threading.Lock()
+        self._coef_T = None  # contiguous FP32 transpose of coef_ for the fast scoring path
+        self._intercept = None
         try:
             self.load_model()
         except Exception as e:
@@ -19,6 +54,14 @@ class ColorectalCancerService:
 
     def load_model(self):
         """Loads the trained logistic regression model from a file."""
+        # Belt-and-braces: also clamp any pools created before the env
+        # vars above took effect (e.g. numpy imported by another module)
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=1)
+        except ImportError:
+            pass
+
         models_dir = os.path.join(settings.MEDIA_ROOT, 'models')
         # NOTE: Ensure this path is correct for your actual model file
         model_path = os.path.join(models_dir, 'logistic_Regression_model.pkl')
@@ -28,22 +71,79 @@ class ColorectalCancerService:
             raise FileNotFoundError(f"Model file not found at {model_path}")
 
         try:
-            self.model = joblib.load(model_path)
+            self.model = joblib.load(model_path, mmap_mode='r')
             logger.info("Colorectal logistic regression model loaded successfully")
 
             # 🔹 Expose training feature names for SHAP alignment, if available
             if hasattr(self.model, "feature_names_in_"):
                 self.feature_names = list(self.model.feature_names_in_)
+                # Build the Index once; reindex against it is a C-level
+                # hashtable join instead of ~21k Python dict lookups
+                self._feature_index = pd.Index(self.feature_names)
+                self._scratch = np.zeros((1, len(self.feature_names)), dtype=np.float32)
                 logger.info(f"Loaded {len(self.feature_names)} feature names from model.feature_names_in_")
             else:
                 self.feature_names = None
+                self._feature_index = None
                 logger.warning("Model has no 'feature_names_in_'; SHAP will rely on input order only.")
 
+            # 🔹 FP32 scoring path: cast the LR weights once and cache a
+            # contiguous transpose so inference is a single sgemv (half the
+            # bandwidth of FP64, negligible accuracy change for a linear model)
+            if hasattr(self.model, "coef_") and self.model.coef_.shape[0] == 1:
+                self.model.coef_ = self.model.coef_.astype(np.float32)
+                self.model.intercept_ = self.model.intercept_.astype(np.float32)
+                self._coef_T = np.ascontiguousarray(self.model.coef_.T)
+                self._intercept = self.model.intercept_
+
             self.model_loaded = True
         except Exception as e:
             logger.error(f"Failed to load logistic regression model: {e}")
             raise
 
+    def _align_patient_values(self, pos, values):
+        """
+        Scatter patient expression values into training feature order.
+
+        `pos` is the get_indexer result against the training Index (-1 for
+        unknown genes) and `values` the matching FP32 expression array.
+        Returns a dense (1, n_features) row, or a CSR row when the profile
+        is mostly zeros and the fast LR scoring path can consume it.
+        """
+        keep = pos >= 0
+        idx = pos[keep]
+        vals = values[keep]
+        np.nan_to_num(vals, copy=False, nan=0.0)
+        n_features = len(self.feature_names)
+
+        nz = np.nonzero(vals)[0]
+        if self._coef_T is not None and len(nz) <= 0.5 * n_features:
+            # Mostly-zero profile: keep it CSR so the matvec only
+            # touches the genes that are actually expressed
+            input_vector = sparse.csr_matrix(
+                (vals[nz], (np.zeros(len(nz), dtype=np.int32), idx[nz])),
+                shape=(1, n_features),
+                dtype=np.float32,
+            )
+            logger.info(
+                f"Patient vector aligned sparse: {len(nz)}/{n_features} nonzero genes"
+            )
+        else:
+            # Dense profile: write the patient's genes into the
+            # preallocated row in place (missing genes stay 0.0); the
+            # buffer is shared, so hold the lock and hand back a copy.
+            with self._scratch_lock:
+                self._scratch.fill(0.0)
+                if _scatter_row is not None:
+                    _scatter_row(values, pos, self._scratch[0])
+                else:
+                    self._scratch[0, idx] = vals
+                input_vector = self._scratch.copy()
+            logger.info(
+                f"Patient vector aligned to training feature order: shape {input_vector.shape}"
+            )
+        return input_vector
+
     def preprocess_patient_data(self, df):
         """
         Preprocesses single-patient data for prediction / SHAP.
@@ -57,28 +157,33 @@ class ColorectalCancerService:
           - fill any missing genes with 0.0
 
         Returns:
-          np.ndarray of shape (1, n_features)
+          np.ndarray of shape (1, n_features), or a scipy.sparse CSR row of
+          the same shape when the profile is mostly zeros and the fast LR
+          scoring path can consume it directly
         """
         if not self.model_loaded:
             raise RuntimeError("Model is not loaded")
 
         try:
-            # Drop any genes with missing expression
-            df_clean = df.dropna(axis=0, how='any')
-
-            # Series of expression values; index = gene symbols
-            values_series = df_clean.iloc[:, 0]
+            # Series of expression values; index = gene symbols. NaNs are
+            # zeroed during alignment below instead of paying dropna's full
+            # dataframe copy up front.
+            values_series = df.iloc[:, 0]
 
             if self.feature_names is not None:
-                # Align by training-time gene order
-                aligned_values = [float(values_series.get(g, 0.0)) for g in self.feature_names]
-                input_vector = np.array(aligned_values, dtype=float).reshape(1, -1)
-                logger.info(
-                    f"Patient vector aligned to training feature order: shape {input_vector.shape}"
-                )
+                # One C-level hashtable probe over all incoming genes; -1
+                # marks genes the model was not trained on
+                pos = self._feature_index.get_indexer(df.index)
+                # Zero-copy view when the CSV was parsed as float32
+                # upstream; only non-float32 columns pay a cast
+                values = values_series.to_numpy()
+                if values.dtype != np.float32:
+                    values = values.astype(np.float32)
+                input_vector = self._align_patient_values(pos, values)
             else:
                 # Fallback: no known feature names, just use as-is
                 input_vector = values_series.to_numpy(dtype=float).reshape(1, -1)
+                np.nan_to_num(input_vector, copy=False, nan=0.0)
                 logger.warning(
                     "feature_names not set; using raw patient vector order. "
                     "SHAP explanations may not be consistent across runs."
@@ -90,6 +195,54 @@ class ColorectalCancerService:
             logger.error(f"Error in preprocessing: {e}")
             raise
 
+    def preprocess_from_bytes(self, csv_bytes):
+        """
+        Preprocess a raw uploaded CSV (bytes) without going through pandas.
+
+        pyarrow's multithreaded CSV reader skips the BlockManager and dtype
+        inference a DataFrame round-trip pays for a two-column file; when
+        pyarrow is not installed we fall back to the pandas path.
+        """
+        if not self.model_loaded:
+            raise RuntimeError("Model is not loaded")
+
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            import io
+            return self.preprocess_patient_data(pd.read_csv(io.BytesIO(csv_bytes), index_col=0))
+
+        try:
+            table = pacsv.read_csv(pa.BufferReader(csv_bytes))
+            genes = table.column(0).to_pylist()
+            values = table.column(1).to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+
+            if self.feature_names is None:
+                input_vector = np.asarray(values, dtype=float).reshape(1, -1)
+                np.nan_to_num(input_vector, copy=False, nan=0.0)
+                return input_vector
+
+            pos = self._feature_index.get_indexer(genes)
+            return self._align_patient_values(pos, values)
+
+        except Exception as e:
+            logger.error(f"Error in preprocessing: {e}")
+            raise
+
+    def _predict_proba_fp32(self, patient_vector):
+        """
+        Hand-rolled logistic regression probabilities: one FP32 matvec plus
+        a sigmoid, bypassing sklearn's copy-and-validate path entirely.
+        """
+        if sparse.issparse(patient_vector):
+            z = patient_vector @ self._coef_T + self._intercept
+        else:
+            x = patient_vector.astype(np.float32, copy=False)
+            z = x @ self._coef_T + self._intercept
+        p1 = expit(z)
+        return np.hstack([1.0 - p1, p1])
+
     def predict(self, patient_vector):
         """
         Predicts the class (0=Normal, 1=Cancer) for a preprocessed patient vector.
@@ -98,10 +251,14 @@ class ColorectalCancerService:
             raise RuntimeError("Model not loaded")
 
         try:
-            prediction = self.model.predict(patient_vector)
-            prediction_prob = self.model.predict_proba(patient_vector)
+            # One scoring pass: derive the class from the probabilities
+            # instead of recomputing the same linear combination in predict()
+            if self._coef_T is not None:
+                prediction_prob = self._predict_proba_fp32(patient_vector)
+            else:
+                prediction_prob = self.model.predict_proba(patient_vector)
 
-            predicted_class = int(prediction[0])
+            predicted_class = int(np.argmax(prediction_prob[0]))
             # Get the probability of the predicted class
             confidence = float(np.max(prediction_prob[0]))
 
@@ -154,5 +311,8 @@ class ColorectalCancerService:
             },
         ]
 
-# Global instance for use in your Django views
-colorectal_cancer_service = ColorectalCancerService()
+# Lazy singleton: joblib.load happens on first use, not at Django import,
+# so workers that never serve this endpoint skip the load entirely
+@lru_cache(maxsize=1)
+def get_colorectal_cancer_service():
+    return ColorectalCancerService()
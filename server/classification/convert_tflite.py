@@ -0,0 +1,69 @@
+# convert_tflite.py
+#
+# One-off converter: quantize the trained LUAD/LUSC Keras MLP to INT8 and
+# FP16 TFLite flatbuffers that LungCancerMLService picks up automatically
+# (FP16 is used when a GPU delegate is available, INT8 on CPU).
+#
+# Usage (from the server/ directory, with the training venv active):
+#     python classification/convert_tflite.py
+#
+# Full INT8 needs a calibration file of ~100 preprocessed PCA vectors from
+# the training set, saved as media/models/calibration_pca.npy with shape
+# (n_samples, n_components).
+
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '..', 'media', 'models')
+KERAS_PATH = os.path.join(MODELS_DIR, 'model.keras')
+CALIBRATION_PATH = os.path.join(MODELS_DIR, 'calibration_pca.npy')
+INT8_PATH = os.path.join(MODELS_DIR, 'model_int8.tflite')
+FP16_PATH = os.path.join(MODELS_DIR, 'model_fp16.tflite')
+
+
+def representative_dataset():
+    samples = np.load(CALIBRATION_PATH).astype(np.float32)
+    for row in samples[:100]:
+        yield [row.reshape(1, -1)]
+
+
+def main():
+    model = keras.models.load_model(KERAS_PATH)
+
+    # Full INT8 when calibration data is available; otherwise fall back to
+    # dynamic-range quantization (weights-only int8, no calibration needed)
+    try:
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+        tflite_model = converter.convert()
+        variant = "full INT8"
+    except Exception as e:
+        print(f"Full INT8 conversion failed ({e}); using dynamic-range quantization")
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        tflite_model = converter.convert()
+        variant = "dynamic-range INT8"
+
+    with open(INT8_PATH, 'wb') as f:
+        f.write(tflite_model)
+    print(f"Saved {variant} model to {INT8_PATH} ({len(tflite_model)} bytes)")
+
+    # FP16 variant for GPU-delegate deployments (INT8 is CPU-only there)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    tflite_model = converter.convert()
+    with open(FP16_PATH, 'wb') as f:
+        f.write(tflite_model)
+    print(f"Saved FP16 model to {FP16_PATH} ({len(tflite_model)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
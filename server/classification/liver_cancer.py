@@ -1,58 +1,154 @@
 # liver_cancer.py
 
 import os
+
+# Pin BLAS to one thread per process; must be set before numpy is
+# imported (see colorectal_cancer.py for rationale)
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+import threading
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 import joblib
-from sklearn.preprocessing import StandardScaler
+from scipy.special import expit
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _scatter_row(values, pos, out):
+        # Fused mask + scatter in one compiled pass: skips unknown genes
+        # (pos == -1) and NaNs without materializing boolean-mask temporaries
+        for i in range(pos.shape[0]):
+            j = pos[i]
+            if j >= 0:
+                v = values[i]
+                if v == v:
+                    out[j] = v
+except ImportError:
+    _scatter_row = None
+
+
 class LiverCancerService:
     def __init__(self):
         self.model = None
-        # NOTE: Ideally, the fitted scaler should be loaded from a file
-        # along with the model, not initialized as a new StandardScaler()
-        self.scaler = StandardScaler()
+        self.scaler = None  # pre-fitted training scaler, loaded in load_model
+        self._mean = None  # float32 scaler stats for the in-place transform
+        self._inv_std = None
         self.model_loaded = False
         self.feature_names = None  # 🔹 will hold training-time feature (gene) order
+        self._feature_index = None  # pandas Index over feature_names for fast alignment
+        self._scratch = None  # preallocated (1, n_features) float32 row, reused per request
+        self._scratch_lock = threading.Lock()
+        self._coef_T = None  # contiguous FP32 transpose of coef_ for the fast scoring path
+        self._intercept = None
         try:
             self.load_model()
         except Exception as e:
             logger.error(f"Failed to initialize Liver Cancer service: {e}")
 
     def load_model(self):
+        # Belt-and-braces: also clamp any pools created before the env
+        # vars above took effect (e.g. numpy imported by another module)
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=1)
+        except ImportError:
+            pass
+
         models_dir = os.path.join(settings.MEDIA_ROOT, 'models')
         # NOTE: Verify your model's actual filename
         model_path = os.path.join(models_dir, 'logistic_model.pkl')
+        scaler_path = os.path.join(models_dir, 'scaler.pkl')
 
         if not os.path.exists(model_path):
             logger.error(f"Liver cancer model file not found at {model_path}")
             raise FileNotFoundError(f"Model file not found at {model_path}")
 
         try:
-            self.model = joblib.load(model_path)
+            self.model = joblib.load(model_path, mmap_mode='r')
             logger.info("Liver cancer ensemble model loaded successfully")
 
             # 🔹 Expose training feature names for SHAP alignment, if available
             if hasattr(self.model, "feature_names_in_"):
                 self.feature_names = list(self.model.feature_names_in_)
+                # Build the Index once; reindex against it is a C-level
+                # hashtable join instead of ~20k Python dict lookups
+                self._feature_index = pd.Index(self.feature_names)
+                self._scratch = np.zeros((1, len(self.feature_names)), dtype=np.float32)
                 logger.info(f"Liver cancer model feature_names_in_ length: {len(self.feature_names)}")
             else:
                 self.feature_names = None
+                self._feature_index = None
                 logger.warning(
                     "Liver cancer model has no 'feature_names_in_'; "
                     "SHAP explanations will rely on input order only."
                 )
 
+            # 🔹 FP32 scoring path: when the model exposes binary LR
+            # weights, cache a contiguous transpose so inference is one
+            # sgemv plus a sigmoid, skipping sklearn's validation wrapper
+            if hasattr(self.model, "coef_") and self.model.coef_.shape[0] == 1:
+                self._coef_T = np.ascontiguousarray(self.model.coef_.T, dtype=np.float32)
+                self._intercept = self.model.intercept_.astype(np.float32)
+
         except Exception as e:
             logger.error(f"Failed to load liver cancer ensemble model: {e}")
             raise
 
+        # 🔹 Load the training-time scaler; per-request fit_transform on a
+        # single row is both wrong (mean=value, std=0) and wasted compute
+        if os.path.exists(scaler_path):
+            try:
+                self.scaler = joblib.load(scaler_path, mmap_mode='r')
+                self._mean = self.scaler.mean_.astype(np.float32)
+                self._inv_std = (1.0 / self.scaler.scale_).astype(np.float32)
+                logger.info("Liver cancer scaler loaded successfully")
+            except Exception as e:
+                logger.error(f"Failed to load liver cancer scaler: {e}")
+                self.scaler = None
+        else:
+            logger.warning(
+                f"Scaler file not found at {scaler_path}; "
+                "patient vectors will be passed through unscaled."
+            )
+
         self.model_loaded = True
 
+    def _align_patient_values(self, pos, values):
+        """
+        Scatter patient expression values into training feature order.
+
+        `pos` is the get_indexer result against the training Index (-1 for
+        unknown genes) and `values` the matching FP32 expression array.
+        Writes into the shared preallocated row (missing genes stay 0.0)
+        and returns a copy.
+        """
+        with self._scratch_lock:
+            self._scratch.fill(0.0)
+            if _scatter_row is not None:
+                _scatter_row(values, pos, self._scratch[0])
+            else:
+                keep = pos >= 0
+                vals = values[keep]
+                np.nan_to_num(vals, copy=False, nan=0.0)
+                self._scratch[0, pos[keep]] = vals
+            return self._scratch.copy()
+
+    def _apply_scaler(self, input_vector):
+        """One fused in-place standardization pass: (x - mean) * inv_std."""
+        if self._mean is not None:
+            np.subtract(input_vector, self._mean, out=input_vector)
+            np.multiply(input_vector, self._inv_std, out=input_vector)
+        return input_vector
+
     def preprocess_patient_data(self, df):
         """
         Preprocess single patient RNA-Seq CSV for prediction / SHAP.
@@ -63,25 +159,30 @@ class LiverCancerService:
         - df's FIRST column = expression values for one patient
 
         Steps:
-        - Drop rows with NaN
+        - Treat NaN expression values as missing (zeroed during alignment)
         - Align gene expression to training-time feature order (if available)
         - Shape to (1, n_features)
-        - Scale using StandardScaler (fit_transform here; in production use a pre-fitted scaler + transform)
+        - Scale with the pre-fitted training scaler (transform only)
         """
         if not self.model_loaded:
             raise RuntimeError("Model not loaded")
 
         try:
-            # Drop missing values
-            df_clean = df.dropna(axis=0, how='any')
-
-            # Series: index = gene symbol, values = expression
-            values_series = df_clean.iloc[:, 0]
+            # Series: index = gene symbol, values = expression. NaNs are
+            # zeroed during alignment below instead of paying dropna's full
+            # dataframe copy up front.
+            values_series = df.iloc[:, 0]
 
             if self.feature_names is not None:
-                # Align to training feature order
-                aligned_values = [float(values_series.get(g, 0.0)) for g in self.feature_names]
-                input_vector = np.array(aligned_values, dtype=float).reshape(1, -1)
+                # One C-level hashtable probe over all incoming genes; -1
+                # marks genes the model was not trained on
+                pos = self._feature_index.get_indexer(df.index)
+                # Zero-copy view when the CSV was parsed as float32
+                # upstream; only non-float32 columns pay a cast
+                values = values_series.to_numpy()
+                if values.dtype != np.float32:
+                    values = values.astype(np.float32)
+                input_vector = self._align_patient_values(pos, values)
                 logger.info(f"Liver patient vector aligned to training feature_names: shape {input_vector.shape}")
             else:
                 # Fallback: no known training feature order, use raw series order
@@ -90,21 +191,66 @@ class LiverCancerService:
                     input_vector = arr.reshape(1, -1)
                 else:
                     input_vector = arr
+                np.nan_to_num(input_vector, copy=False, nan=0.0)
                 logger.warning(
                     "LiverCancerService.feature_names is None; using raw gene order from input. "
                     "SHAP explanations may not be consistent."
                 )
 
-            # Scale input vector (NOTE: in production, use a fitted scaler + scaler.transform)
-            scaled_vector = self.scaler.fit_transform(input_vector)
-            logger.info(f"Liver patient scaled vector shape: {scaled_vector.shape}")
+            # Apply the pre-fitted scaler (transform only, never re-fit)
+            input_vector = self._apply_scaler(input_vector)
+            logger.info(f"Liver patient scaled vector shape: {input_vector.shape}")
+
+            return input_vector
+
+        except Exception as e:
+            logger.error(f"Error in liver cancer data preprocessing: {e}")
+            raise
+
+    def preprocess_from_bytes(self, csv_bytes):
+        """
+        Preprocess a raw uploaded CSV (bytes) without going through pandas.
+
+        pyarrow's multithreaded CSV reader skips the BlockManager and dtype
+        inference a DataFrame round-trip pays for a two-column file; when
+        pyarrow is not installed we fall back to the pandas path.
+        """
+        if not self.model_loaded:
+            raise RuntimeError("Model not loaded")
 
-            return scaled_vector
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            import io
+            return self.preprocess_patient_data(pd.read_csv(io.BytesIO(csv_bytes), index_col=0))
+
+        try:
+            table = pacsv.read_csv(pa.BufferReader(csv_bytes))
+            genes = table.column(0).to_pylist()
+            values = table.column(1).to_numpy(zero_copy_only=False).astype(np.float32, copy=False)
+
+            if self.feature_names is None:
+                input_vector = np.asarray(values, dtype=float).reshape(1, -1)
+                np.nan_to_num(input_vector, copy=False, nan=0.0)
+                return self._apply_scaler(input_vector)
+
+            pos = self._feature_index.get_indexer(genes)
+            return self._apply_scaler(self._align_patient_values(pos, values))
 
         except Exception as e:
             logger.error(f"Error in liver cancer data preprocessing: {e}")
             raise
 
+    def _predict_proba_fp32(self, patient_vector):
+        """
+        Hand-rolled logistic regression probabilities: one FP32 matvec plus
+        a sigmoid, bypassing sklearn's copy-and-validate path entirely.
+        """
+        x = patient_vector.astype(np.float32, copy=False)
+        p1 = expit(x @ self._coef_T + self._intercept)
+        return np.hstack([1.0 - p1, p1])
+
     def predict(self, scaled_patient_vector):
         """
         Predict using ensemble model.
@@ -114,10 +260,14 @@ class LiverCancerService:
             raise RuntimeError("Model not loaded")
 
         try:
-            prediction = self.model.predict(scaled_patient_vector)
-            prediction_proba = self.model.predict_proba(scaled_patient_vector)
+            # One scoring pass: derive the class from the probabilities
+            # instead of recomputing the same linear combination in predict()
+            if self._coef_T is not None:
+                prediction_proba = self._predict_proba_fp32(scaled_patient_vector)
+            else:
+                prediction_proba = self.model.predict_proba(scaled_patient_vector)
 
-            predicted_class = int(prediction[0])
+            predicted_class = int(np.argmax(prediction_proba[0]))
             predicted_prob = float(np.max(prediction_proba[0]))
 
             logger.info(f"Liver cancer prediction class: {predicted_class}, probability: {predicted_prob}")
@@ -172,5 +322,8 @@ class LiverCancerService:
             },
         ]
 
-# Global instance
-liver_cancer_service = LiverCancerService()
+# Lazy singleton: joblib.load happens on first use, not at Django import,
+# so workers that never serve this endpoint skip the load entirely
+@lru_cache(maxsize=1)
+def get_liver_cancer_service():
+    return LiverCancerService()
@@ -1,30 +1,74 @@
 import os
+
+# Quiet TF C++ logging; must be set before tensorflow is imported
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+# Pin BLAS to one thread per process; must be set before numpy is
+# imported (see colorectal_cancer.py for rationale)
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
+import threading
+
 import pandas as pd
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
 import joblib
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+from functools import lru_cache
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Optional Numba-fused forward pass for the 4-layer MLP: LLVM compiles the
+# whole relu chain into one kernel with no per-op NumPy dispatch. Compiled
+# lazily on first call and cached on disk; plain NumPy handles every other
+# architecture and machines without numba.
+try:
+    from numba import njit
+
+    @njit(cache=True, fastmath=True)
+    def _mlp4_forward(x, W1, b1, W2, b2, W3, b3, W4, b4):
+        h = np.maximum(0.0, x @ W1 + b1)
+        h = np.maximum(0.0, h @ W2 + b2)
+        h = np.maximum(0.0, h @ W3 + b3)
+        return 1.0 / (1.0 + np.exp(-(h @ W4 + b4)))
+except ImportError:
+    _mlp4_forward = None
+
 class LungCancerMLService:
     def __init__(self):
         self.model = None
-        self.scaler = StandardScaler()
         self.pca_transformer = None
         self.feature_names = None          # 🔹 Will hold feature names used for SHAP
+        self._pc_names = None  # constant PC1..PCk list shared across requests
+        self._cls_buf = np.empty(32, dtype=np.uint8)  # reused threshold buffer
+        self._static_performance = None
+        self._cls_buf_lock = threading.Lock()
         self.model_loaded = False
         self.expected_features = None
+        self._infer_fn = None  # compiled forward pass, built once in load_model
+        self._weights = None  # FP32 (W, b) pairs for the NumPy forward pass
+        self._pca_mean = None  # FP32 PCA stats for the manual projection
+        self._pca_components_T = None
+        self._W_fused = None  # (PCA ∘ first dense) fused matrix and bias
+        self._b_fused = None
+        self._onnx_session = None  # onnxruntime session when model.onnx is shipped
+        self._onnx_input = None
+        self._tflite = None  # TFLite interpreter when a quantized flatbuffer is shipped
+        self._tflite_in = None
+        self._tflite_out = None
         try:
             self.load_model()
         except Exception as e:
             logger.error(f"Failed to initialize ML service: {e}")
 
     def load_model(self):
+        # TF's ~2 s import is paid here, on first use of this service,
+        # instead of by every worker that merely imports the module
+        import tensorflow as tf
+        from tensorflow import keras
+
         models_dir = os.path.join(settings.MEDIA_ROOT, 'models')
         model_path = os.path.join(models_dir, 'model.keras')
         pca_path = os.path.join(models_dir, 'pca_transformer.pkl')
@@ -33,6 +77,21 @@ class LungCancerMLService:
             logger.error(f"Model file not found at {model_path}")
             raise FileNotFoundError(f"Model file not found at {model_path}")
 
+        # Inference runs on CPU; skip CUDA device init entirely
+        try:
+            tf.config.set_visible_devices([], 'GPU')
+        except Exception:
+            pass
+
+        # Match the BLAS pinning above: one worker per core means TF's
+        # default thread-per-core pools only oversubscribe the box
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(1)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except Exception:
+            # Raises if TF already initialized its threadpools; harmless
+            pass
+
         try:
             # 🔹 This is your trained classifier — satisfies service.model requirement
             self.model = keras.models.load_model(model_path)
@@ -41,25 +100,194 @@ class LungCancerMLService:
             logger.error(f"Failed to load model: {e}")
             raise
 
-        if os.path.exists(pca_path):
+        # Prefer FP32 .npy snapshots of the PCA stats over the sklearn
+        # pickle: plain .npy files memory-map (mmap_mode is silently
+        # ignored for zipped .npz archives), so workers share page-cached
+        # weights and cold boot skips unpickling the whole estimator. The
+        # snapshots are written automatically the first time the pickle
+        # is loaded.
+        pca_mean_path = os.path.join(models_dir, 'pca_mean.npy')
+        pca_components_path = os.path.join(models_dir, 'pca_components.npy')
+        if os.path.exists(pca_mean_path) and os.path.exists(pca_components_path):
             try:
-                self.pca_transformer = joblib.load(pca_path)
+                self._pca_mean = np.load(pca_mean_path, mmap_mode='r')
+                # shape (n_components, n_genes); .T is a view on the mmap
+                components = np.load(pca_components_path, mmap_mode='r')
+                self._pca_components_T = components.T
+                self.expected_features = int(components.shape[0])
+                logger.info("PCA stats loaded from npy snapshots")
+            except Exception as e:
+                logger.error(f"Failed to load PCA npy snapshots: {e}")
+                self._pca_mean = None
+                self._pca_components_T = None
+
+        if self._pca_components_T is None and os.path.exists(pca_path):
+            try:
+                self.pca_transformer = joblib.load(pca_path, mmap_mode='r')
                 logger.info("PCA transformer loaded successfully")
                 self.expected_features = self.pca_transformer.n_components_
+                # Cache FP32 stats so the projection is one sgemv:
+                # (x - mean) @ components.T, no sklearn validation pass
+                self._pca_mean = self.pca_transformer.mean_.astype(np.float32)
+                self._pca_components_T = np.ascontiguousarray(
+                    self.pca_transformer.components_.astype(np.float32).T
+                )
+                try:
+                    np.save(pca_mean_path, self._pca_mean)
+                    np.save(
+                        pca_components_path,
+                        self.pca_transformer.components_.astype(np.float32),
+                    )
+                    logger.info(f"Saved PCA npy snapshots to {models_dir}")
+                except OSError as e:
+                    logger.warning(f"Could not persist PCA npy snapshots: {e}")
             except Exception as e:
                 logger.error(f"Failed to load PCA transformer: {e}")
                 self.pca_transformer = None
-        else:
+        elif self._pca_components_T is None:
             logger.warning("PCA transformer not found, skipping PCA")
             self.pca_transformer = None
             self.expected_features = self.model.input_shape[1]
 
+        # Prefer an ONNX export of the classifier when one is shipped next
+        # to the Keras artifact (tf2onnx.convert.from_keras): onnxruntime's
+        # fused MLAS kernels beat TF dispatch on single-row inference.
+        # An int8 variant (onnxruntime.quantization.quantize_dynamic) wins
+        # again where it exists — MLAS dispatches its int8 GEMMs to VNNI on
+        # CPUs that have it, and ORT quantizes the FP32 input itself.
+        # Pinned to one intra-op thread — the matvecs are tiny and the
+        # server already runs one worker per core.
+        onnx_path = next(
+            (
+                p
+                for p in (
+                    os.path.join(models_dir, 'model_int8.onnx'),
+                    os.path.join(models_dir, 'model.onnx'),
+                )
+                if os.path.exists(p)
+            ),
+            None,
+        )
+        if onnx_path is not None:
+            try:
+                import onnxruntime as ort
+
+                so = ort.SessionOptions()
+                so.intra_op_num_threads = 1
+                so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self._onnx_session = ort.InferenceSession(
+                    onnx_path, sess_options=so, providers=['CPUExecutionProvider']
+                )
+                self._onnx_input = self._onnx_session.get_inputs()[0].name
+                logger.info("ONNX model loaded successfully")
+            except Exception as e:
+                logger.warning(f"Failed to load ONNX model, using Keras weights: {e}")
+                self._onnx_session = None
+
+        # INT8 TFLite flatbuffer (see convert_tflite.py): XNNPACK int8
+        # dense kernels move ~4x fewer bytes than FP32 and the file loads
+        # near-instantly. Single-threaded for the same oversubscription
+        # reasons as the BLAS pinning above.
+        # A GPU delegate cannot run INT8, but it can run the FP16 variant
+        # (half the bandwidth of FP32); probe for it and pick the file at
+        # load time so predict stays branchless — the affine-quantization
+        # step in _predict_tflite is a no-op for the FP16 model.
+        tflite_int8 = os.path.join(models_dir, 'model_int8.tflite')
+        tflite_fp16 = os.path.join(models_dir, 'model_fp16.tflite')
+        tflite_path, delegates = None, None
+        if os.path.exists(tflite_fp16):
+            try:
+                delegate = tf.lite.experimental.load_delegate(
+                    'libtensorflowlite_gpu_delegate.so'
+                )
+                tflite_path, delegates = tflite_fp16, [delegate]
+            except Exception:
+                pass
+        if tflite_path is None and os.path.exists(tflite_int8):
+            tflite_path = tflite_int8
+
+        if self._onnx_session is None and tflite_path is not None:
+            try:
+                self._tflite = tf.lite.Interpreter(
+                    model_path=tflite_path,
+                    num_threads=1,
+                    experimental_delegates=delegates,
+                )
+                self._tflite.allocate_tensors()
+                self._tflite_in = self._tflite.get_input_details()[0]
+                self._tflite_out = self._tflite.get_output_details()[0]
+                logger.info(f"TFLite model loaded successfully: {os.path.basename(tflite_path)}")
+            except Exception as e:
+                logger.warning(f"Failed to load TFLite model, using Keras weights: {e}")
+                self._tflite = None
+
+        # The classifier is a tiny ReLU MLP with a sigmoid head; cache its
+        # weights as contiguous FP32 arrays so inference can be a handful of
+        # BLAS matvecs with no TF dispatch at all.
+        try:
+            self._weights = [
+                tuple(np.ascontiguousarray(w, dtype=np.float32) for w in layer.get_weights())
+                for layer in self.model.layers
+                if layer.get_weights()
+            ]
+        except Exception as e:
+            logger.warning(f"Could not extract dense weights for NumPy inference: {e}")
+            self._weights = None
+
+        # Fuse the PCA projection into the first dense layer: since both
+        # are affine, (x - mean) @ C.T @ W1 + b1 collapses to one matrix
+        # and bias over the raw gene vector (see predict_from_genes)
+        self._W_fused = None
+        self._b_fused = None
+        if self._pca_components_T is not None and self._weights:
+            try:
+                W1, b1 = self._weights[0]
+                self._W_fused = np.ascontiguousarray(
+                    np.asarray(self._pca_components_T, dtype=np.float32) @ W1
+                )
+                self._b_fused = b1 - (
+                    np.asarray(self._pca_mean, dtype=np.float32) @ self._pca_components_T
+                ) @ W1
+            except Exception as e:
+                logger.warning(f"Could not fuse PCA with the first dense layer: {e}")
+                self._W_fused = None
+
+        # Compile the forward pass once; model.predict() builds a tf.data
+        # pipeline and callback machinery per call, which dominates latency
+        # for the (1, k) inputs this service actually serves.
+        # jit_compile lets XLA fuse the dense+bias+relu chain into one
+        # kernel; the compile cost is paid below in the warm-up, not on
+        # the first user request.
+        # Only needed when the weight extraction above failed — predict
+        # prefers the NumPy path, so tracing and compiling here would
+        # otherwise be pure startup cost for a function never called.
+        self._infer_fn = None
+        if not self._weights:
+            self._infer_fn = tf.function(
+                lambda x: self.model(x, training=False),
+                input_signature=[tf.TensorSpec([None, self.expected_features], tf.float32)],
+                jit_compile=True,
+            )
+            # Trace the single concrete function now so the first request
+            # doesn't pay the one-off tracing cost
+            if self.expected_features is not None:
+                try:
+                    self._infer_fn(tf.zeros((1, self.expected_features), tf.float32))
+                except Exception as e:
+                    logger.warning(f"Inference warm-up trace failed: {e}")
+
         # 🔹 Initialize feature_names based on model input dimension
         # If PCA is used, features are PCA components (PC1, PC2, ...)
-        if self.pca_transformer is not None and self.expected_features is not None:
-            self.feature_names = [f"PC{i+1}" for i in range(self.expected_features)]
+        if (
+            self.pca_transformer is not None or self._pca_components_T is not None
+        ) and self.expected_features is not None:
+            # Built once — the PC names never change for a loaded model, so
+            # requests share this list instead of reallocating it
+            self._pc_names = [f"PC{i+1}" for i in range(self.expected_features)]
+            self.feature_names = self._pc_names
         else:
             # Will be set later from data when no PCA
+            self._pc_names = None
             self.feature_names = None
 
         self.model_loaded = True
@@ -69,34 +297,50 @@ class LungCancerMLService:
             raise RuntimeError("Model not loaded")
 
         try:
-            df_clean = df.dropna(axis=0, how='any')
-            logger.info(f"Data shape after dropping NaNs: {df_clean.shape}")
-
-            df_transposed = df_clean.transpose()
-            logger.info(f"Data shape after transpose: {df_transposed.shape}")
-
-            input_vector = df_transposed.values
-            logger.debug(f"Input vector shape before reshape check: {input_vector.shape}")
-
-            # Ensure the input is always 2D
-            if input_vector.ndim == 1:
-                input_vector = input_vector.reshape(1, -1)
-                logger.info("Reshaped 1D input vector to 2D for a single sample.")
-
-            if self.pca_transformer:
-                data_transformed = self.pca_transformer.transform(input_vector)
+            # Drop NaN rows with a NumPy mask instead of df.dropna, which
+            # rebuilds the whole DataFrame through the BlockManager
+            arr = df.to_numpy(dtype=np.float32, copy=False)
+            if arr.ndim == 1:
+                arr = arr.reshape(-1, 1)
+            nan_rows = np.isnan(arr).any(axis=1)
+            if nan_rows.any():
+                arr = arr[~nan_rows]
+                kept_index = df.index[~nan_rows]
+            else:
+                kept_index = df.index
+            logger.info(f"Data shape after dropping NaNs: {arr.shape}")
+
+            # Samples are columns in the CSV; a single-patient column only
+            # needs a reshape (no transposed copy), multi-sample input gets
+            # a transposed view
+            if arr.shape[1] == 1:
+                input_vector = arr.reshape(1, -1)
+            else:
+                input_vector = np.ascontiguousarray(arr.T)
+            logger.info(f"Data shape after transpose: {input_vector.shape}")
+
+            if self.pca_transformer is not None or self._pca_components_T is not None:
+                if self._pca_components_T is not None:
+                    data_transformed = (input_vector - self._pca_mean) @ self._pca_components_T
+                else:
+                    data_transformed = self.pca_transformer.transform(input_vector)
                 logger.info(f"Data shape after PCA: {data_transformed.shape}")
 
-                # 🔹 If PCA is used, SHAP will be over PCA components
-                self.feature_names = [f"PC{i+1}" for i in range(data_transformed.shape[1])]
+                # 🔹 If PCA is used, SHAP will be over PCA components;
+                # reuse the list built at load time when the width matches
+                if self._pc_names is not None and len(self._pc_names) == data_transformed.shape[1]:
+                    self.feature_names = self._pc_names
+                else:
+                    self.feature_names = [f"PC{i+1}" for i in range(data_transformed.shape[1])]
             else:
                 data_transformed = input_vector
 
-                # 🔹 If no PCA, features correspond to genes (row index of df_clean)
-                self.feature_names = df_clean.index.tolist()
+                # 🔹 If no PCA, features correspond to genes (row index of the input)
+                self.feature_names = kept_index.tolist()
 
             # 🔹 Keep returning gene index list for existing code that uses gene_names
-            return data_transformed, df_clean.index.tolist()
+            # Hand predict a contiguous FP32 buffer so no backend re-casts
+            return np.ascontiguousarray(data_transformed, dtype=np.float32), kept_index.tolist()
 
         except Exception as e:
             logger.error(f"Error in preprocessing: {e}")
@@ -114,23 +358,145 @@ class LungCancerMLService:
         data_array, _ = self.preprocess_rna_seq_data(df)
         return data_array
 
+    def _predict_tflite(self, data_array):
+        """
+        Run the quantized TFLite interpreter: quantize the FP32 input with
+        the model's affine parameters, invoke, dequantize the output.
+        """
+        x = np.asarray(data_array, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        # The converter freezes a (1, n_features) input; resize for other
+        # batch sizes and refresh the cached tensor details
+        if tuple(self._tflite_in['shape']) != x.shape:
+            self._tflite.resize_tensor_input(self._tflite_in['index'], x.shape)
+            self._tflite.allocate_tensors()
+            self._tflite_in = self._tflite.get_input_details()[0]
+            self._tflite_out = self._tflite.get_output_details()[0]
+        scale, zero_point = self._tflite_in['quantization']
+        if scale:
+            x = np.clip(np.round(x / scale + zero_point), -128, 127).astype(
+                self._tflite_in['dtype']
+            )
+        self._tflite.set_tensor(self._tflite_in['index'], x)
+        self._tflite.invoke()
+        out = self._tflite.get_tensor(self._tflite_out['index'])
+        scale, zero_point = self._tflite_out['quantization']
+        if scale:
+            out = (out.astype(np.float32) - zero_point) * scale
+        return out
+
+    def _forward_numpy(self, data_array):
+        """
+        Manual MLP forward pass over the cached FP32 weights: ReLU hidden
+        layers, sigmoid output — identical math to the Keras graph.
+        """
+        h = np.ascontiguousarray(data_array, dtype=np.float32)
+        if h.ndim == 1:
+            h = h.reshape(1, -1)
+        if _mlp4_forward is not None and len(self._weights) == 4:
+            (W1, b1), (W2, b2), (W3, b3), (W4, b4) = self._weights
+            return _mlp4_forward(h, W1, b1, W2, b2, W3, b3, W4, b4)
+        for W, b in self._weights[:-1]:
+            h = np.maximum(0.0, h @ W + b)
+        W, b = self._weights[-1]
+        return 1.0 / (1.0 + np.exp(-(h @ W + b)))
+
     def predict(self, data_array):
         if not self.model_loaded:
             raise RuntimeError("Model not loaded")
 
         try:
-            predictions = self.model.predict(data_array, verbose=0)
+            if self._onnx_session is not None:
+                predictions = self._onnx_session.run(
+                    None, {self._onnx_input: np.asarray(data_array, dtype=np.float32)}
+                )[0]
+            elif self._tflite is not None:
+                predictions = self._predict_tflite(data_array)
+            elif self._weights:
+                # Pure NumPy forward pass: ~20k MACs of real work, so the
+                # BLAS matvecs beat even the compiled TF graph on dispatch
+                predictions = self._forward_numpy(data_array)
+            else:
+                # Direct compiled call instead of model.predict(): no tf.data
+                # setup, no batching loop, just the traced graph. TF is
+                # already imported by load_model at this point.
+                import tensorflow as tf
+
+                inputs = tf.constant(data_array, dtype=tf.float32)
+                if self._infer_fn is not None:
+                    predictions = self._infer_fn(inputs).numpy()
+                else:
+                    predictions = self.model(inputs, training=False).numpy()
             logger.info(f"Raw prediction output: {predictions}")
 
-            predicted_classes = (predictions > 0.5).astype(int).flatten()
-            probabilities = predictions.flatten()
+            # Threshold into a reused uint8 buffer: one ufunc call, no
+            # intermediate bool/int64 arrays. The buffer is shared, so
+            # convert to a list before releasing the lock.
+            flat = np.ravel(predictions).astype(np.float32, copy=False)
+            n = flat.shape[0]
+            with self._cls_buf_lock:
+                buf = self._cls_buf[:n] if n <= self._cls_buf.shape[0] else np.empty(n, dtype=np.uint8)
+                np.greater(flat, np.float32(0.5), out=buf)
+                predicted_classes = buf.tolist()
 
-            return predicted_classes.tolist(), probabilities.tolist()
+            return predicted_classes, flat.tolist()
 
         except Exception as e:
             logger.error(f"Prediction failed: {e}")
             raise
 
+    def predict_from_genes(self, gene_vector):
+        """
+        Score a raw aligned gene vector with the fused (PCA ∘ first dense)
+        matrix: one sgemm over the genes, then the remaining MLP tail. For
+        callers that don't need the PCA intermediate (unlike the SHAP
+        endpoint, which explains over PC space), this skips a full pass
+        over the gene vector.
+        """
+        if not self.model_loaded:
+            raise RuntimeError("Model not loaded")
+        if self._W_fused is None or not self._weights:
+            raise RuntimeError("Fused PCA/MLP weights are not available")
+
+        x = np.ascontiguousarray(gene_vector, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+
+        h = np.maximum(0.0, x @ self._W_fused + self._b_fused)
+        for W, b in self._weights[1:-1]:
+            h = np.maximum(0.0, h @ W + b)
+        W, b = self._weights[-1]
+        predictions = 1.0 / (1.0 + np.exp(-(h @ W + b)))
+
+        flat = np.ravel(predictions)
+        return (flat > 0.5).astype(np.uint8).tolist(), flat.tolist()
+
+    def predict_batch(self, data_arrays):
+        """
+        Score several preprocessed patients with a single forward pass.
+
+        Stacking the rows turns N dispatch-bound matvecs into one proper
+        GEMM, so per-sample overhead is amortized across the batch. Returns
+        a list of (predicted_classes, probabilities) pairs, one per input.
+        """
+        if not data_arrays:
+            return []
+
+        rows = [
+            np.asarray(a, dtype=np.float32).reshape(1, -1) if np.ndim(a) == 1 else np.asarray(a, dtype=np.float32)
+            for a in data_arrays
+        ]
+        predicted, probabilities = self.predict(np.vstack(rows))
+
+        results = []
+        offset = 0
+        for row in rows:
+            n = row.shape[0]
+            results.append((predicted[offset:offset + n], probabilities[offset:offset + n]))
+            offset += n
+        return results
+
     def format_classification_results(self, predicted_classes, probabilities, gene_names, gene_expression):
         pred_class = predicted_classes[0]
         pred_prob = probabilities[0]
@@ -146,41 +512,61 @@ class LungCancerMLService:
             },
             'gene_heatmap_data': {
                 'genes': gene_names,
-                'expression': gene_expression.tolist() if isinstance(gene_expression, np.ndarray) else gene_expression
+                # Kept as an ndarray: the orjson response path serializes it
+                # directly without materializing 20k Python floats
+                'expression': np.asarray(gene_expression, dtype=np.float32)
             }
         }
 
     def calculate_model_performance(self, y_true=None, y_pred=None, y_prob=None):
-        if y_true is not None and y_pred is not None:
-            accuracy = accuracy_score(y_true, y_pred)
-            precision = precision_score(y_true, y_pred, average='binary', zero_division=0)
-            recall = recall_score(y_true, y_pred, average='binary', zero_division=0)
-            f1 = f1_score(y_true, y_pred, average='binary', zero_division=0)
-
-            performance_metrics = [
-                {'metric': 'Accuracy', 'value': f'{float(accuracy):.1%}', 'description': 'Overall LUAD vs LUSC classification accuracy'},
-                {'metric': 'Precision', 'value': f'{float(precision):.1%}', 'description': 'LUAD prediction precision'},
-                {'metric': 'Sensitivity (Recall)', 'value': f'{float(recall):.1%}', 'description': 'LUAD detection rate'},
-                {'metric': 'F1 Score', 'value': f'{float(f1):.1%}', 'description': 'Harmonic mean of precision and recall'}
-            ]
+        if y_true is None or y_pred is None:
+            # Static model card: a fixed property of the fitted model, so
+            # build the list once and hand the same object to every request
+            if self._static_performance is None:
+                self._static_performance = [
+                    {'metric': 'Model Type', 'value': 'LUAD vs LUSC Classifier', 'description': 'Lung Adenocarcinoma vs Squamous Cell Carcinoma'},
+                    {'metric': 'Architecture', 'value': 'MLP Neural Network', 'description': 'Multi-Layer Perceptron with L2 regularization'},
+                    {'metric': 'Input Features', 'value': f'{self.expected_features}', 'description': 'Number of PCA components'},
+                    {'metric': 'Hidden Layers', 'value': '128 → 64 → 32 → 1', 'description': 'Layer architecture with ReLU activation'},
+                    {'metric': 'Output', 'value': 'Sigmoid (Binary)', 'description': 'LUAD (1) vs LUSC (0) classification'},
+                    {'metric': 'Framework', 'value': 'TensorFlow/Keras', 'description': 'Deep learning framework'}
+                ]
+            return self._static_performance
+
+        # One bincount pass builds the binary confusion matrix; the
+        # four metrics are then plain arithmetic instead of four
+        # separate sklearn calls that each rescan the arrays
+        y_t = np.ravel(np.asarray(y_true, dtype=np.int8))
+        y_p = np.ravel(np.asarray(y_pred, dtype=np.int8))
+        tn, fp, fn, tp = (int(v) for v in np.bincount((y_t << 1) | y_p, minlength=4)[:4])
+
+        total = tn + fp + fn + tp
+        accuracy = (tp + tn) / total if total else 0.0
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+        performance_metrics = [
+            {'metric': 'Accuracy', 'value': f'{float(accuracy):.1%}', 'description': 'Overall LUAD vs LUSC classification accuracy'},
+            {'metric': 'Precision', 'value': f'{float(precision):.1%}', 'description': 'LUAD prediction precision'},
+            {'metric': 'Sensitivity (Recall)', 'value': f'{float(recall):.1%}', 'description': 'LUAD detection rate'},
+            {'metric': 'F1 Score', 'value': f'{float(f1):.1%}', 'description': 'Harmonic mean of precision and recall'}
+        ]
+
+        if y_prob is not None:
+            try:
+                # AUC needs a full ranking pass; leave that to sklearn
+                from sklearn.metrics import roc_auc_score
 
-            if y_prob is not None:
-                try:
-                    auc = roc_auc_score(y_true, y_prob)
-                    performance_metrics.append({'metric': 'AUC-ROC', 'value': f'{float(auc):.3f}', 'description': 'Area under the ROC curve'})
-                except Exception as e:
-                    logger.warning(f"Could not calculate AUC-ROC: {e}")
-        else:
-            performance_metrics = [
-                {'metric': 'Model Type', 'value': 'LUAD vs LUSC Classifier', 'description': 'Lung Adenocarcinoma vs Squamous Cell Carcinoma'},
-                {'metric': 'Architecture', 'value': 'MLP Neural Network', 'description': 'Multi-Layer Perceptron with L2 regularization'},
-                {'metric': 'Input Features', 'value': f'{self.expected_features}', 'description': 'Number of PCA components'},
-                {'metric': 'Hidden Layers', 'value': '128 → 64 → 32 → 1', 'description': 'Layer architecture with ReLU activation'},
-                {'metric': 'Output', 'value': 'Sigmoid (Binary)', 'description': 'LUAD (1) vs LUSC (0) classification'},
-                {'metric': 'Framework', 'value': 'TensorFlow/Keras', 'description': 'Deep learning framework'}
-            ]
+                auc = roc_auc_score(y_true, y_prob)
+                performance_metrics.append({'metric': 'AUC-ROC', 'value': f'{float(auc):.3f}', 'description': 'Area under the ROC curve'})
+            except Exception as e:
+                logger.warning(f"Could not calculate AUC-ROC: {e}")
 
         return performance_metrics
 
-# Global instance
-ml_service = LungCancerMLService()
+# Lazy singleton: the Keras/PCA load happens on first use, not at Django
+# import, so worker startup doesn't pay the full TF graph load
+@lru_cache(maxsize=1)
+def get_ml_service():
+    return LungCancerMLService()
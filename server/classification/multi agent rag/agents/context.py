@@ -0,0 +1,25 @@
+"""Shared context builder for the gene and drug agents."""
+
+# One C-level pass to flatten whitespace, applied after slicing so bytes
+# beyond the used prefix are never touched.
+_WS_TRANS = str.maketrans({"\n": " ", "\r": " ", "\t": " "})
+
+
+def build_context(docs, max_chars: int = 800) -> str:
+    """Build a compact context string from retrieved docs."""
+    chunks = []
+    total = 0
+    for d in docs:
+        text = (getattr(d, "page_content", "") or "")[:max_chars].translate(_WS_TRANS).strip()
+        if not text:
+            continue
+
+        need = max_chars - total
+        if need <= 0:
+            break
+
+        chunk = text[:need]
+        chunks.append(chunk)
+        total += len(chunk)
+
+    return "\n\n".join(chunks)
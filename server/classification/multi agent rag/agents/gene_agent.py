@@ -1,5 +1,7 @@
 from rag_backend.llm_local import run_llm
 
+from agents.context import build_context
+
 GENE_PROMPT = """
 You are a biomedical gene analysis agent.
 
@@ -20,27 +22,8 @@ Write a gene-focused summary of 2-3 short paragraphs.
 """
 
 
-def _build_context(docs, max_chars: int = 800) -> str:
-    """Build a compact context string from retrieved docs."""
-    chunks = []
-    total = 0
-    for d in docs:
-        text = (getattr(d, "page_content", "") or "").replace("\n", " ").strip()
-        if not text:
-            continue
-
-        need = max_chars - total
-        if need <= 0:
-            break
-
-        chunk = text[:need]
-        chunks.append(chunk)
-        total += len(chunk)
-
-    return "\n\n".join(chunks)
-
-
-def run_gene_agent(question: str, docs):
-    context = _build_context(docs, max_chars=800)
+def run_gene_agent(question: str, docs, context: str = None):
+    if context is None:
+        context = build_context(docs, max_chars=800)
     prompt = GENE_PROMPT.format(context=context, question=question)
     return run_llm(prompt)
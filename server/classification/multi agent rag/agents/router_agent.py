@@ -1,3 +1,6 @@
+import re
+from functools import lru_cache
+
 from rag_backend.llm_local import run_llm
 
 ROUTER_PROMPT = """
@@ -11,12 +14,40 @@ Return ONLY one word: "gene", "drug", or "both".
 Query: {question}
 """
 
-def route_question(question: str) -> str:
+_DRUG_HINT = re.compile(r"\b(drug|therap\w*|inhibitor\w*|treatment\w*)\b", re.IGNORECASE)
+_GENE_HINT = re.compile(r"\b(gene\w*|mutation\w*|expression|biomarker\w*)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def _route_cached(question: str) -> str:
+    # Obvious queries are routed by keyword without an LLM round-trip
+    drug_hit = _DRUG_HINT.search(question)
+    gene_hit = _GENE_HINT.search(question)
+    if drug_hit and gene_hit:
+        return "both"
+
     response = run_llm(ROUTER_PROMPT.format(question=question))
     response = response.lower().strip()
 
+    if response.startswith("[llm error]"):
+        # Raising keeps lru_cache from storing the result, so a
+        # transient Gemini failure doesn't pin a routing decision for
+        # the life of the process
+        raise RuntimeError(response)
+
     if "gene" in response and "drug" in response:
         return "both"
     if "drug" in response:
         return "drug"
     return "gene"
+
+
+def route_question(question: str) -> str:
+    # Normalize before caching so trivially different phrasings of the
+    # same question share one routing decision
+    try:
+        return _route_cached(" ".join(question.lower().split()))
+    except RuntimeError:
+        # Uncached default; the next call with this question retries
+        # the LLM
+        return "gene"
@@ -1,28 +1,36 @@
+from io import StringIO
 from typing import List, Any
 from rag_backend.llm_local import run_llm
 
+_DOC_SEPARATOR = "\n\n---\n\n"
+
 
 def _docs_to_text(docs: List[Any], max_chars: int = 2500) -> str:
     """Convert retriever documents into a truncated text block."""
-    chunks = []
+    # Stream into one buffer instead of collecting chunks and joining:
+    # a single O(total_chars) pass with no intermediate list of slices
+    buf = StringIO()
     total = 0
 
     for d in docs:
-        text = getattr(d, "page_content", str(d))
-        text = text.strip()
+        text = getattr(d, "page_content", str(d)).strip()
         if not text:
             continue
 
-        if total + len(text) > max_chars:
+        n = len(text)
+        if total + n > max_chars:
             text = text[: max_chars - total]
+            n = len(text)
 
-        chunks.append(text)
-        total += len(text)
+        if total:
+            buf.write(_DOC_SEPARATOR)
+        buf.write(text)
+        total += n
 
         if total >= max_chars:
             break
 
-    return "\n\n---\n\n".join(chunks)
+    return buf.getvalue()
 
 
 def run_summary_agent(
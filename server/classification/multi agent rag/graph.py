@@ -4,6 +4,7 @@ from typing import TypedDict, List, Any
 from langgraph.graph import StateGraph, END
 
 from rag_backend.retriever import get_retriever
+from agents.context import build_context
 from agents.router_agent import route_question
 from agents.gene_agent import run_gene_agent
 from agents.drug_agent import run_drug_agent
@@ -14,6 +15,7 @@ from agents.summary_agent import run_summary_agent
 class GraphState(TypedDict, total=False):
     question: str
     docs: List[Any]
+    context: str
     route: str
     gene_answer: str
     drug_answer: str
@@ -29,8 +31,9 @@ def build_graph():
         """First node: retrieve relevant documents for the question."""
         q = state["question"]
         docs = retriever.invoke(q)
-        # Only update docs; question stays in state
-        return {"docs": docs}
+        # Build the shared agent context once here, so the gene and drug
+        # agents don't each re-scan the same docs on the "both" route.
+        return {"docs": docs, "context": build_context(docs, max_chars=800)}
 
     def route(state: GraphState) -> GraphState:
         """Router node: decide whether the query is gene-focused, drug-focused, or both."""
@@ -42,14 +45,14 @@ def build_graph():
         """Gene Agent node."""
         q = state["question"]
         docs = state.get("docs", [])
-        gene_answer = run_gene_agent(q, docs)
+        gene_answer = run_gene_agent(q, docs, context=state.get("context"))
         return {"gene_answer": gene_answer}
 
     def drug(state: GraphState) -> GraphState:
         """Drug Agent node."""
         q = state["question"]
         docs = state.get("docs", [])
-        drug_answer = run_drug_agent(q, docs)
+        drug_answer = run_drug_agent(q, docs, context=state.get("context"))
         return {"drug_answer": drug_answer}
 
     def summarize(state: GraphState) -> GraphState:
@@ -1,4 +1,5 @@
 import os
+from io import StringIO
 from dotenv import load_dotenv # <--- ADD THIS LINE
 load_dotenv() # <--- ADD THIS LINE: It will look for a .env file in the current or parent directory
 
@@ -45,14 +46,22 @@ def run_llm(prompt: str) -> str:
         print(f"[LLM ERROR] {type(e).__name__}: {e}")
         return f"[LLM ERROR] {type(e).__name__}: {e}"
 
-    collected = []
+    # Accumulate into one buffer with a hard output cap: bounds memory on
+    # runaway generations and avoids the per-chunk list bookkeeping.
+    MAX_OUTPUT_CHARS = 32000
+    buf = StringIO()
+    written = 0
 
     try:
         for chunk in stream:
+            if written >= MAX_OUTPUT_CHARS:
+                break
+
             # Newer SDKs expose chunk.text for each streamed delta
             text_piece = getattr(chunk, "text", None)
             if text_piece:
-                collected.append(text_piece)
+                buf.write(text_piece)
+                written += len(text_piece)
                 continue
 
             # Fallback: try to access candidates / parts if .text is missing
@@ -72,13 +81,14 @@ def run_llm(prompt: str) -> str:
             for p in parts:
                 t = getattr(p, "text", None)
                 if t:
-                    collected.append(t)
+                    buf.write(t)
+                    written += len(t)
     except Exception as e:
         # Even if streaming breaks mid-way, return whatever we collected
         print(f"[LLM STREAM ERROR] {type(e).__name__}: {e}")
 
-    if not collected:
+    if not written:
         # Absolute last fallback if nothing came through
         return "[LLM ERROR] Gemini returned no text in streamed chunks."
 
-    return "".join(collected).strip()
+    return buf.getvalue().strip()
@@ -1,13 +1,32 @@
+import os
+from functools import lru_cache
+
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from rag_backend.embed_model import MiniLMEmbeddings
+from rag_backend.simple_retriever import SIMPLE_DIR, load_simple_retriever
 
-PERSIST_DIR = "chroma_biomarker_lit"
-EMB_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+FAISS_DIR = "faiss_biomarker_lit"
+CHROMA_DIR = "chroma_biomarker_lit"
 
+@lru_cache(maxsize=1)
 def get_retriever():
-    embeddings = HuggingFaceEmbeddings(model_name=EMB_MODEL)
-    db = Chroma(
-        persist_directory=PERSIST_DIR,
-        embedding_function=embeddings,
-    )
-    return db.as_retriever(search_kwargs={"k": 4})
\ No newline at end of file
+    embeddings = MiniLMEmbeddings()
+    if os.path.exists(FAISS_DIR):
+        # Flat IP index over normalized vectors; loads via mmap in O(1)
+        db = FAISS.load_local(
+            FAISS_DIR,
+            embeddings,
+            allow_dangerous_deserialization=True,
+        )
+    elif os.path.exists(SIMPLE_DIR):
+        # Plain-NumPy top-k shim; same .invoke interface, no vector store
+        return load_simple_retriever()
+    else:
+        # Legacy Chroma store from before the FAISS migration
+        db = Chroma(
+            persist_directory=CHROMA_DIR,
+            embedding_function=embeddings,
+        )
+    return db.as_retriever(search_kwargs={"k": 4})
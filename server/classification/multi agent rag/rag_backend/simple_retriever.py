@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import orjson
+from langchain_core.documents import Document
+
+from rag_backend.embed_model import get_embedding_model, inference_ctx
+
+SIMPLE_DIR = "simple_biomarker_lit"
+TOP_K = 4
+
+
+class SimpleRetriever:
+    """
+    Zero-dependency top-k retriever for the small filtered corpus: one
+    BLAS matrix-vector product over all (N, 384) normalized embeddings
+    plus argpartition, instead of an ANN index. Exposes the same
+    .invoke(query) -> List[Document] interface as the LangChain retriever.
+    """
+
+    def __init__(self, embeddings: np.ndarray, docs, k: int = TOP_K):
+        self._embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._docs = docs
+        self._k = k
+
+    def invoke(self, query: str):
+        model = get_embedding_model()
+        with inference_ctx():
+            qv = model.encode(
+                [query], convert_to_numpy=True, normalize_embeddings=True
+            )[0]
+
+        scores = self._embeddings @ qv.astype(np.float32)
+        k = min(self._k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self._docs[i] for i in top]
+
+
+def load_simple_retriever(base_dir: str = SIMPLE_DIR) -> SimpleRetriever:
+    """Load the embeddings.npy + docs.json sidecar written by the build script."""
+    embeddings = np.load(os.path.join(base_dir, "embeddings.npy"))
+    with open(os.path.join(base_dir, "docs.json"), "rb") as f:
+        raw = orjson.loads(f.read())
+    docs = [Document(page_content=r["text"], metadata=r["metadata"]) for r in raw]
+    return SimpleRetriever(embeddings, docs)
@@ -0,0 +1,152 @@
+# tasks.py
+#
+# The heavy part of analyze_classification — model inference and result
+# persistence — lives here so it can run either inline in the request
+# (the default) or on a Celery worker when a broker is deployed and
+# CLASSIFICATION_ASYNC is enabled in settings. Celery itself is optional,
+# handled the same way as the other soft dependencies in this app.
+
+import io
+import logging
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from .models import AnalysisSession, ClassificationResult, ModelPerformance
+from .ml_service import get_ml_service
+from .colorectal_cancer import get_colorectal_cancer_service
+from .liver_cancer import get_liver_cancer_service
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
+try:
+    from celery import shared_task
+except ImportError:
+    shared_task = None
+
+logger = logging.getLogger(__name__)
+
+SERVICE_GETTERS = {
+    'lung_cancer': get_ml_service,
+    'colorectal_cancer': get_colorectal_cancer_service,
+    'liver_cancer': get_liver_cancer_service,
+}
+
+
+def read_expression_csv(source):
+    """
+    Parse a gene-expression CSV (gene symbols in the first column) into a
+    float32-valued DataFrame indexed by gene.
+
+    pyarrow's multithreaded C++ reader is used when installed — typically
+    several times faster than pandas' single-threaded C engine on 20k-row
+    numeric files — with pandas as the fallback parser. Shared by the
+    views and the queued task so the two parse paths cannot diverge.
+    """
+    if pacsv is not None:
+        try:
+            if hasattr(source, 'read'):
+                arrow_source = pa.BufferReader(source.read())
+            else:
+                arrow_source = source
+            table = pacsv.read_csv(
+                arrow_source,
+                read_options=pacsv.ReadOptions(use_threads=True),
+            )
+            df = table.to_pandas().set_index(table.column_names[0])
+            return df.astype(np.float32, copy=False)
+        except Exception:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+    # Parse without dtype — a scalar dtype would also be applied to the
+    # string gene-symbol index column and raise — then cast the values
+    df = pd.read_csv(source, index_col=0)
+    return df.astype(np.float32, copy=False)
+
+
+def execute_classification(session, df, model_type):
+    """
+    Run inference for one AnalysisSession and persist its results.
+
+    Returns (individual_results, model_performance) for callers that build
+    an HTTP response. On failure the session is marked failed and the
+    exception re-raised so a synchronous caller can surface it.
+    """
+    try:
+        service = SERVICE_GETTERS[model_type]()
+
+        if model_type in ('colorectal_cancer', 'liver_cancer'):
+            preprocessed_data = service.preprocess_patient_data(df)
+            predicted_class, predicted_prob = service.predict(preprocessed_data)
+            individual_results = service.format_results(predicted_class, predicted_prob)
+        else:  # lung_cancer
+            data_array, gene_names = service.preprocess_rna_seq_data(df)
+            predicted_classes, probabilities = service.predict(data_array)
+            # ravel() is a view for the contiguous (1, n) array, where
+            # flatten() always copied the ~20k floats
+            individual_results = service.format_classification_results(
+                predicted_classes, probabilities, gene_names, data_array.ravel()
+            )
+
+        if hasattr(service, "get_model_specifications"):
+            model_performance = service.get_model_specifications()
+        elif hasattr(service, "calculate_model_performance"):
+            model_performance = service.calculate_model_performance()
+        else:
+            model_performance = []
+
+        ClassificationResult.objects.create(
+            analysis_session=session,
+            result_type=f'{model_type}_classification',
+            class_label=individual_results['patient_prediction']['label'],
+            probability=individual_results['patient_prediction']['confidence'],
+            confidence_score=1
+        )
+
+        # One INSERT for all metrics instead of a round-trip per row
+        ModelPerformance.objects.bulk_create([
+            ModelPerformance(
+                analysis_session=session,
+                metric_name=metric['metric'],
+                metric_value=metric['value'],
+                metric_description=metric['description']
+            )
+            for metric in model_performance
+        ], batch_size=100)
+
+        session.status = 'completed'
+        session.completed_at = timezone.now()
+        session.save()
+
+        return individual_results, model_performance
+
+    except Exception as e:
+        session.status = 'failed'
+        session.error_message = str(e)
+        session.save()
+        logger.error(f"Analysis failed: {str(e)}")
+        raise
+
+
+if shared_task is not None:
+    @shared_task
+    def run_classification(session_id, csv_text, model_type):
+        """
+        Celery entry point: re-parse the CSV payload and run the pipeline.
+        The client polls get_results, which already reports session status.
+        """
+        session = AnalysisSession.objects.get(session_id=session_id)
+        df = read_expression_csv(io.BytesIO(csv_text.encode('utf-8')))
+        try:
+            execute_classification(session, df, model_type)
+        except Exception:
+            # Already recorded on the session; nothing to return to a caller
+            logger.exception(f"Queued analysis {session_id} failed")
+else:
+    run_classification = None
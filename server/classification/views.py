@@ -1,156 +1,159 @@
 import os
 import uuid
 import logging
+import threading
+import hashlib
 import base64
 import json
+import csv
 import networkx as nx
 import io
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+# Headless backend chosen up front; the plot path uses the OO Figure API
+# directly, so no global pyplot state is touched under threaded workers
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import requests
-from django.http import JsonResponse
+from concurrent.futures import ThreadPoolExecutor
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # SIMD-accelerated base64; worthwhile for PNG-sized plot payloads
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.files.storage import default_storage
 from django.utils import timezone
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Case, IntegerField, Sum, When
 from .models import Patient, AnalysisSession, ClassificationResult, ModelPerformance
-from .ml_service import ml_service
-from .colorectal_cancer import colorectal_cancer_service
-from .liver_cancer import liver_cancer_service
+from . import tasks
+from .tasks import execute_classification, read_expression_csv, run_classification
 import shap
 from .ai_agent import run_multi_agent_rag
 logger = logging.getLogger(__name__)
 
+# One dict lookup resolves model_type to its lazy service factory; tasks.py
+# keeps the canonical mapping so the two stay in sync
+SERVICE_GETTERS = tasks.SERVICE_GETTERS
+
+def _json_response(payload, status=200):
+    """
+    Serialize large result payloads with orjson when available: it encodes
+    NumPy arrays natively at C speed, so a 20k-gene expression vector never
+    has to be exploded into Python floats. Falls back to the stdlib encoder
+    (converting arrays on the fly) when orjson is not installed.
+    """
+    if orjson is not None:
+        return HttpResponse(
+            orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+            content_type='application/json',
+            status=status,
+        )
+    body = json.dumps(
+        payload,
+        default=lambda o: o.tolist() if isinstance(o, np.ndarray) else str(o),
+    )
+    return HttpResponse(body, content_type='application/json', status=status)
+
+
 def align_patient_vector(df, feature_names):
     """
     Align single patient input vector from CSV df (gene rows) to match model's expected features.
     Missing genes have zero values.
     Returns a numpy array reshaped to (1, n_features).
     """
+    # reindex aligns via pandas' C-level hash join in one shot instead of a
+    # Python .get() loop over ~20k gene names
     series = df.iloc[:, 0]
-    values = [series.get(g, 0.0) for g in feature_names]
-    values_array = np.array(values).reshape(1, -1)  # Reshape to (1, n)
-    return values_array
-
-
-
-@csrf_exempt
-@require_http_methods(["POST"])
-def analyze_classification(request):
-    try:
-        if 'file' not in request.FILES:
-            return JsonResponse({'error': 'No file uploaded'}, status=400)
-        uploaded_file = request.FILES['file']
-        if not uploaded_file.name.endswith('.csv'):
-            return JsonResponse({'error': 'Only CSV files are allowed'}, status=400)
-
-        model_type = request.POST.get('model_type', 'lung_cancer')
-        age = request.POST.get('age')
-        gender = request.POST.get('gender')
-        patient_id = request.POST.get('patient_id', f'PAT-{uuid.uuid4().hex[:8].upper()}')
-
-        if not age or not gender:
-            return JsonResponse({'error': 'Age and gender are required'}, status=400)
-
+    return (
+        series.reindex(feature_names, fill_value=0.0)
+        .to_numpy(dtype=np.float32, copy=False)
+        .reshape(1, -1)
+    )
+
+
+
+try:
+    from numba import njit, prange
+
+    @njit(cache=True, parallel=True)
+    def _nearest_seed(dist):
+        # Fused min+argmin over the seed axis in one parallel pass
+        n = dist.shape[1]
+        best_seed = np.zeros(n, dtype=np.int64)
+        best_dist = np.empty(n, dtype=dist.dtype)
+        for j in prange(n):
+            bd = dist[0, j]
+            bs = 0
+            for i in range(1, dist.shape[0]):
+                d = dist[i, j]
+                if d < bd:
+                    bd = d
+                    bs = i
+            best_dist[j] = bd
+            best_seed[j] = bs
+        return best_seed, best_dist
+except ImportError:
+    _nearest_seed = None
+
+
+_shap_init_lock = threading.Lock()
+
+
+def _get_shap_explainer(service, model, n_features):
+    """
+    Return the SHAP explainer for this service, building it at most once.
+
+    TreeExplainer walks the fitted tree structure exactly, which is orders
+    of magnitude faster than KernelExplainer's permutation sampling, so
+    tree models get that path. Everything else (the lung Keras MLP) gets a
+    KernelExplainer against a persistent background: the lung inputs are
+    mean-centred PCA scores, so the zero vector *is* the training-set mean
+    and makes a stable, request-independent reference. The explainer and
+    background are cached on the service singleton under a lock so Django's
+    threaded workers never race the lazy init.
+    """
+    explainer = getattr(service, '_shap_explainer', None)
+    if explainer is not None:
+        return explainer
+    with _shap_init_lock:
+        explainer = getattr(service, '_shap_explainer', None)
+        if explainer is not None:
+            return explainer
         try:
-            age = int(age)
-            if age < 0 or age > 150:
-                return JsonResponse({'error': 'Invalid age'}, status=400)
-        except ValueError:
-            return JsonResponse({'error': 'Age must be a number'}, status=400)
-
-        if model_type == 'lung_cancer':
-            service = ml_service
-        elif model_type == 'colorectal_cancer':
-            service = colorectal_cancer_service
-        elif model_type == 'liver_cancer':
-            service = liver_cancer_service
-        else:
-            return JsonResponse({'error': f'Unknown model type {model_type}'}, status=400)
-
-        if not service.model_loaded:
-            return JsonResponse({'error': 'ML model not loaded.'}, status=500)
-
-        file_path = f'uploads/{patient_id}_{uploaded_file.name}'
-        saved_path = default_storage.save(file_path, uploaded_file)
-
-        with transaction.atomic():
-            patient, created = Patient.objects.get_or_create(
-                patient_id=patient_id,
-                defaults={'age': age, 'gender': gender}
-            )
-            session = AnalysisSession.objects.create(
-                patient=patient,
-                model_type=model_type,
-                file_name=uploaded_file.name,
-                file_path=saved_path,
-                file_size=uploaded_file.size,
-                status='processing'
-            )
+            explainer = shap.TreeExplainer(model)
+        except Exception:
+            background = getattr(service, '_shap_background', None)
+            if background is None:
+                background = np.zeros((1, n_features), dtype=np.float32)
+                service._shap_background = background
+            if hasattr(model, "predict_proba"):
+                f = model.predict_proba
+            else:
+                # Keras model: wrap to return numpy
+                def f(x):
+                    return model.predict(x, verbose=0)
             try:
-                full_path = default_storage.path(saved_path)
-                df = pd.read_csv(full_path, index_col=0)
-
-                if df.empty:
-                    raise ValueError("CSV file is empty")
-
-                if model_type in ('colorectal_cancer', 'liver_cancer'):
-                    processed_input = service.preprocess_patient_data(df)
-                    predicted_class, predicted_prob = service.predict(processed_input)
-                    individual_results = service.format_results(predicted_class, predicted_prob)
-                    model_performance = []
-                else:
-                    data_array, gene_names = service.preprocess_rna_seq_data(df)
-                    predicted_classes, probabilities = service.predict(data_array)
-                    individual_results = service.format_classification_results(
-                        predicted_classes, probabilities, gene_names, data_array.flatten()
-                    )
-                    model_performance = service.calculate_model_performance()
-
-                ClassificationResult.objects.create(
-                    analysis_session=session,
-                    result_type=f'{model_type}_classification',
-                    class_label=individual_results['patient_prediction']['label'],
-                    probability=individual_results['patient_prediction']['confidence'],
-                    confidence_score=1
-                )
-
-                for metric in model_performance:
-                    ModelPerformance.objects.create(
-                        analysis_session=session,
-                        metric_name=metric['metric'],
-                        metric_value=metric['value'],
-                        metric_description=metric['description']
-                    )
-
-                session.status = 'completed'
-                session.completed_at = timezone.now()
-                session.save()
-
-                if os.path.exists(full_path):
-                    os.remove(full_path)
-
-                return JsonResponse({
-                    'session_id': str(session.session_id),
-                    'patient_id': patient_id,
-                    'classification_results': individual_results['patient_prediction'],
-                    'model_performance': model_performance,
-                    'gene_heatmap_data': individual_results.get('gene_heatmap_data'),
-                    'status': 'success',
-                })
-            except Exception as e:
-                session.status = 'failed'
-                session.error_message = str(e)
-                session.save()
-                logger.error(f'Analysis failed: {e}')
-                raise e
-
-    except Exception as e:
-        logger.error(f'Request processing failed: {e}')
-        return JsonResponse({'error': f'Analysis failed: {e}'}, status=500)
-
+                # Permutation explainer converges in far fewer model
+                # evaluations than Kernel's coalition sampling
+                explainer = shap.PermutationExplainer(f, background)
+            except Exception:
+                explainer = shap.KernelExplainer(f, background)
+        service._shap_explainer = explainer
+    return explainer
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -170,25 +173,18 @@ def generate_xai_graph(request):
         model_type = request.POST.get('model_type', 'lung_cancer')
 
         # --- Select service based on model_type ---
-        if model_type == 'lung_cancer':
-            service = ml_service
-        elif model_type == 'colorectal_cancer':
-            service = colorectal_cancer_service
-        elif model_type == 'liver_cancer':
-            service = liver_cancer_service
-        else:
+        get_service = SERVICE_GETTERS.get(model_type)
+        if get_service is None:
             return JsonResponse({'error': f'Unknown model type {model_type}'}, status=400)
+        service = get_service()
 
         if not service.model_loaded:
             return JsonResponse({'error': 'ML model not loaded'}, status=500)
 
         logger.info(f"[XAI] model_type={model_type}, service={service.__class__.__name__}")
 
-        # --- Save & read CSV ---
-        tmp_path = default_storage.save(f'tmp/{uuid.uuid4()}.csv', uploaded_file)
-        full_path = default_storage.path(tmp_path)
-
-        df = pd.read_csv(full_path, index_col=0)
+        # --- Read CSV straight from the upload buffer; nothing to persist ---
+        df = read_expression_csv(uploaded_file)
         if df.empty:
             return JsonResponse({'error': 'CSV file is empty'}, status=400)
 
@@ -197,10 +193,6 @@ def generate_xai_graph(request):
         model = service.model
         feature_names = service.feature_names
 
-        # Clean temp file early
-        if os.path.exists(full_path):
-            os.remove(full_path)
-
         if feature_names is None:
             raise ValueError("service.feature_names is None; cannot map importances to genes")
 
@@ -222,11 +214,6 @@ def generate_xai_graph(request):
                     f"[CRC] Length mismatch in coef importances: {len(feature_arr)} vs {len(importance)}"
                 )
 
-            importance_df = (
-                pd.DataFrame({"gene": feature_arr, "importance": importance})
-                  .sort_values("importance", ascending=False)
-            )
-
         # =========================================================
         #   B) Liver → logistic regression coefficients
         # =========================================================
@@ -245,33 +232,35 @@ def generate_xai_graph(request):
                     f"[Liver] Length mismatch in coef importances: {len(feature_arr)} vs {len(importance)}"
                 )
 
-            importance_df = (
-                pd.DataFrame({"gene": feature_arr, "importance": importance})
-                  .sort_values("importance", ascending=False)
-            )
-
         # =========================================================
         #   C) Lung → SHAP on PCA features
         # =========================================================
         else:
             # --- SHAP computation for lung PCA MLP ---
             try:
-                # For generic models (Keras MLP), use KernelExplainer on predict_proba
-                if hasattr(model, "predict_proba"):
-                    f = model.predict_proba
-                else:
-                    # Keras model: wrap to return numpy
-                    def f(x):
-                        return model.predict(x, verbose=0)
-
-                # Simple background: few copies of the sample (cheap & stable)
-                if processed_input.shape[0] == 1:
-                    background = np.repeat(processed_input, 10, axis=0)
+                # Explainer (and its background) is built once per model
+                # load and reused across requests
+                explainer = _get_shap_explainer(
+                    service, model, processed_input.shape[1]
+                )
+                if isinstance(
+                    explainer, getattr(shap, 'PermutationExplainer', ())
+                ):
+                    shap_values = explainer(
+                        processed_input, max_evals=500
+                    ).values
+                elif isinstance(explainer, shap.KernelExplainer):
+                    # Bound the coalition sampling: 200 synthetic samples
+                    # with an L1-selected feature subset is plenty for a
+                    # top-20 bar plot, versus the 2*M+2048 default
+                    shap_values = explainer.shap_values(
+                        processed_input,
+                        nsamples=200,
+                        l1_reg='num_features(50)',
+                        silent=True,
+                    )
                 else:
-                    background = processed_input
-
-                explainer = shap.KernelExplainer(f, background)
-                shap_values = explainer.shap_values(processed_input)
+                    shap_values = explainer.shap_values(processed_input)
             except Exception as e:
                 raise ValueError(f"SHAP computation failed for lung model: {e}")
 
@@ -299,25 +288,36 @@ def generate_xai_graph(request):
                     f"[Lung] Length mismatch: {len(feature_arr)} feature names vs {len(importance)} values"
                 )
 
-            importance_df = (
-                pd.DataFrame({"gene": feature_arr, "importance": importance})
-                  .sort_values("importance", ascending=False)
-            )
-
         # --- Plot top-20 biomarkers ---
-        top_df = importance_df.head(20).iloc[::-1]
-        plt.figure(figsize=(8, 6))
-        plt.barh(top_df["gene"], top_df["importance"])
-        plt.xlabel("Feature importance")
-        plt.title(f"Top 20 Biomarkers - {model_type.replace('_', ' ').title()}")
-        plt.tight_layout()
+        # argpartition picks the 20 largest of ~20k importances in O(n),
+        # with no full sort and no intermediate DataFrame
+        top_n = min(20, importance.shape[0])
+        top_idx = np.argpartition(importance, -top_n)[-top_n:]
+        top_idx = top_idx[np.argsort(importance[top_idx])]
+        top_names = np.asarray(feature_arr)[top_idx]
+        top_vals = importance[top_idx]
+
+        # OO API: each request owns its Figure, so concurrent plots never
+        # share (or serialize behind) pyplot's global figure registry
+        fig = Figure(figsize=(8, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
+        ax.barh(top_names, top_vals)
+        ax.set_xlabel("Feature importance")
+        ax.set_title(f"Top 20 Biomarkers - {model_type.replace('_', ' ').title()}")
 
         buf = io.BytesIO()
-        plt.savefig(buf, format="png", dpi=150)
-        plt.close()
-        buf.seek(0)
-        base64_img = base64.b64encode(buf.read()).decode("utf-8")
+        # dpi=80 is plenty for a web chart and halves PNG encode time;
+        fig.savefig(buf, format="png", dpi=80, bbox_inches="tight")
+
+        # Binary response on request: no base64 inflation (+33% payload)
+        # and no extra copies of the PNG through an encoded string
+        if request.POST.get('format') == 'png':
+            return HttpResponse(buf.getvalue(), content_type='image/png')
 
+        # Default keeps the JSON/base64 contract the frontend expects;
+        # getbuffer() encodes straight from the buffer without copying it
+        base64_img = _b64.b64encode(buf.getbuffer()).decode("ascii")
         return JsonResponse({"image": base64_img, "status": "success"})
 
     except Exception as e:
@@ -337,7 +337,17 @@ def analyze_classification(request):
 
         if not uploaded_file.name.endswith('.csv'):
             return JsonResponse({'error': 'Only CSV files are allowed'}, status=400)
-        
+
+        # Cheap content sniff on the first 8KB before any DB rows are
+        # created, so junk payloads fail fast instead of leaving a
+        # failed AnalysisSession behind
+        head = uploaded_file.read(8192)
+        uploaded_file.seek(0)
+        try:
+            csv.Sniffer().sniff(head.decode(errors='ignore'))
+        except csv.Error:
+            return JsonResponse({'error': 'File content is not valid CSV'}, status=400)
+
         model_type = request.POST.get('model_type', 'lung_cancer')
         age = request.POST.get('age')
         gender = request.POST.get('gender')
@@ -354,20 +364,17 @@ def analyze_classification(request):
             return JsonResponse({'error': 'Age must be a number'}, status=400)
 
         # Select service based on model_type
-        if model_type == 'lung_cancer':
-            service = ml_service
-        elif model_type == 'colorectal_cancer':
-            service = colorectal_cancer_service
-        elif model_type == 'liver_cancer':
-            service = liver_cancer_service
-        else:
+        get_service = SERVICE_GETTERS.get(model_type)
+        if get_service is None:
             return JsonResponse({'error': f'Unknown model type: {model_type}'}, status=400)
+        service = get_service()
 
         if not service.model_loaded:
             return JsonResponse({'error': 'ML model not loaded.'}, status=500)
 
+        # Logical name only: the upload is parsed in-memory below, the saved
+        # copy used to be deleted at the end of the request anyway
         file_path = f'uploads/{patient_id}_{uploaded_file.name}'
-        saved_file_path = default_storage.save(file_path, uploaded_file)
 
         with transaction.atomic():
             patient, created = Patient.objects.get_or_create(
@@ -379,61 +386,44 @@ def analyze_classification(request):
                 patient=patient,
                 model_type=model_type,
                 file_name=uploaded_file.name,
-                file_path=saved_file_path,
+                file_path=file_path,
                 file_size=uploaded_file.size,
                 status='processing'
             )
 
+            # Offload to a Celery worker when a broker is deployed, so the
+            # request returns immediately and the client polls get_results
+            # (which already reports session status). Inline execution
+            # stays the default.
+            if run_classification is not None and getattr(settings, 'CLASSIFICATION_ASYNC', False):
+                csv_text = uploaded_file.read().decode('utf-8')
+                # 'pending' is the declared choice for work not yet
+                # started; the worker moves it to completed/failed
+                session.status = 'pending'
+                session.save(update_fields=['status'])
+                transaction.on_commit(
+                    lambda: run_classification.delay(
+                        str(session.session_id), csv_text, model_type
+                    )
+                )
+                return JsonResponse({
+                    'session_id': str(session.session_id),
+                    'patient_id': patient_id,
+                    'status': 'pending',
+                }, status=202)
+
             try:
-                full_path = default_storage.path(saved_file_path)
-                df = pd.read_csv(full_path, index_col=0)
+                # Stream the request body straight into the parser: no
+                # storage write, no re-read, no cleanup
+                df = read_expression_csv(uploaded_file)
 
                 if df.empty:
                     raise ValueError("CSV file is empty")
 
-                # 🔹 Different preprocessing, but unified result object
-                if model_type in ('colorectal_cancer', 'liver_cancer'):
-                    preprocessed_data = service.preprocess_patient_data(df)
-                    predicted_class, predicted_prob = service.predict(preprocessed_data)
-                    individual_results = service.format_results(predicted_class, predicted_prob)
-                else:  # lung_cancer
-                    data_array, gene_names = service.preprocess_rna_seq_data(df)
-                    predicted_classes, probabilities = service.predict(data_array)
-                    individual_results = service.format_classification_results(
-                        predicted_classes, probabilities, gene_names, data_array.flatten()
-                    )
-
-                # 🔥 Unified model specification logic
-                if hasattr(service, "get_model_specifications"):
-                    model_performance = service.get_model_specifications()
-                elif hasattr(service, "calculate_model_performance"):
-                    model_performance = service.calculate_model_performance()
-                else:
-                    model_performance = []
-
-                ClassificationResult.objects.create(
-                    analysis_session=session,
-                    result_type=f'{model_type}_classification',
-                    class_label=individual_results['patient_prediction']['label'],
-                    probability=individual_results['patient_prediction']['confidence'],
-                    confidence_score=1
+                individual_results, model_performance = execute_classification(
+                    session, df, model_type
                 )
 
-                for metric in model_performance:
-                    ModelPerformance.objects.create(
-                        analysis_session=session,
-                        metric_name=metric['metric'],
-                        metric_value=metric['value'],
-                        metric_description=metric['description']
-                    )
-
-                session.status = 'completed'
-                session.completed_at = timezone.now()
-                session.save()
-
-                if os.path.exists(full_path):
-                    os.remove(full_path)
-
                 response_data = {
                     'session_id': str(session.session_id),
                     'patient_id': patient_id,
@@ -442,7 +432,7 @@ def analyze_classification(request):
                     'gene_heatmap_data': individual_results.get('gene_heatmap_data'),
                     'status': 'success',
                 }
-                return JsonResponse(response_data)
+                return _json_response(response_data)
 
             except Exception as e:
                 session.status = 'failed'
@@ -457,29 +447,45 @@ def analyze_classification(request):
 
 
 
+# Badge colours for known class labels; unknown labels fall back to gray
+_CLASS_COLORS = {'Cancer': 'bg-red-500', 'Normal': 'bg-green-500'}
+
+
 @require_http_methods(["GET"])
 def get_results(request, session_id):
     try:
-        session = AnalysisSession.objects.get(session_id=session_id)
+        # select_related folds the patient row into the session SELECT;
+        # the two values() queries below are the only other round-trips
+        session = AnalysisSession.objects.select_related('patient').get(
+            session_id=session_id
+        )
 
-        classification_results = []
-        for result in session.results.all():
-            classification_results.append({
-                'subtype': result.class_label,
-                'probability': result.probability,
-                'count': int(result.confidence_score),
-                'color': 'bg-red-500' if result.class_label == 'Cancer' else 'bg-green-500'
-            })
+        # values() skips model instantiation: the rows are only reshaped
+        # into response dicts
+        classification_results = [
+            {
+                'subtype': r['class_label'],
+                'probability': r['probability'],
+                'count': int(r['confidence_score']),
+                'color': _CLASS_COLORS.get(r['class_label'], 'bg-gray-500')
+            }
+            for r in session.results.values(
+                'class_label', 'probability', 'confidence_score'
+            )
+        ]
 
-        model_performance = []
-        for metric in session.performance_metrics.all():
-            model_performance.append({
-                'metric': metric.metric_name,
-                'value': metric.metric_value,
-                'description': metric.metric_description
-            })
+        model_performance = [
+            {
+                'metric': m['metric_name'],
+                'value': m['metric_value'],
+                'description': m['metric_description']
+            }
+            for m in session.performance_metrics.values(
+                'metric_name', 'metric_value', 'metric_description'
+            )
+        ]
 
-        return JsonResponse({
+        return _json_response({
             'session_id': str(session.session_id),
             'patient_id': session.patient.patient_id,
             'classification_results': classification_results,
@@ -499,13 +505,31 @@ def get_results(request, session_id):
 @require_http_methods(["GET"])
 def get_analysis_history(request):
     try:
-        sessions = AnalysisSession.objects.select_related('patient').all().order_by('-created_at')[:20]
+        # Conditional aggregation folds the per-session Cancer/Normal lookups
+        # into the main query: one SELECT instead of 1 + 2 per session
+        sessions = (
+            AnalysisSession.objects.select_related('patient')
+            .annotate(
+                cancer_count=Sum(
+                    Case(
+                        When(results__class_label='Cancer', then='results__confidence_score'),
+                        default=0,
+                        output_field=IntegerField(),
+                    )
+                ),
+                normal_count=Sum(
+                    Case(
+                        When(results__class_label='Normal', then='results__confidence_score'),
+                        default=0,
+                        output_field=IntegerField(),
+                    )
+                ),
+            )
+            .order_by('-created_at')[:20]
+        )
 
         history = []
         for session in sessions:
-            cancer_count = session.results.filter(class_label='Cancer').first()
-            normal_count = session.results.filter(class_label='Normal').first()
-
             history.append({
                 'session_id': str(session.session_id),
                 'patient_id': session.patient.patient_id,
@@ -513,11 +537,11 @@ def get_analysis_history(request):
                 'status': session.status,
                 'created_at': session.created_at.isoformat(),
                 'completed_at': session.completed_at.isoformat() if session.completed_at else None,
-                'cancer_count': int(cancer_count.confidence_score) if cancer_count else 0,
-                'normal_count': int(normal_count.confidence_score) if normal_count else 0
+                'cancer_count': int(session.cancer_count or 0),
+                'normal_count': int(session.normal_count or 0)
             })
 
-        return JsonResponse({'history': history})
+        return _json_response({'history': history})
 
     except Exception as e:
         logger.error(f"Error retrieving history: {str(e)}")
@@ -544,6 +568,14 @@ def export_report(request, session_id):
 
 DGIDB_GRAPHQL_URL = "https://dgidb.org/api/graphql"
 
+# Interaction data changes rarely; a day of caching spares the 30s POST
+# (and DGIdb's rate limits) on repeated biomarker neighbourhoods
+DGIDB_CACHE_TTL = 86400
+
+# Shard size for large gene sets; chunks are fetched concurrently and
+# cached individually so overlapping neighbourhoods can hit
+DGIDB_CHUNK_SIZE = 100
+
 DGIDB_GRAPHQL_QUERY = """
 query DrugInteractions($genes: [String!]) {
   genes(names: $genes) {
@@ -576,36 +608,22 @@ query DrugInteractions($genes: [String!]) {
 
 
 
-def fetch_dgidb_drugs_via_graphql(genes):
+def _fetch_dgidb_chunk(chunk_genes):
     """
-    Query DGIdb GraphQL API for drug-gene interactions.
-
-    Returns:
-        dict: {
-            "GENE": [
-                {
-                  "drug_name": "...",
-                  "concept_id": "...",
-                  "score": ...,
-                  "types": [...],
-                  "publications": [...],
-                  "sources": [...],
-                },
-                ...
-            ]
-        }
+    POST one GraphQL query for a chunk of gene names and parse the
+    response into {GENE: [drug dicts]}. Cached per chunk, so overlapping
+    biomarker neighbourhoods across requests hit without refetching.
     """
-    if not genes:
-        return {}
+    chunk_genes = list(chunk_genes)
 
-    # Normalized, unique gene names
-    unique_genes = sorted({str(g).strip() for g in genes if str(g).strip()})
-    if not unique_genes:
-        return {}
+    cache_key = 'dgidb:' + hashlib.sha1(','.join(chunk_genes).encode()).hexdigest()
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     payload = {
         "query": DGIDB_GRAPHQL_QUERY,
-        "variables": {"genes": unique_genes}
+        "variables": {"genes": chunk_genes}
     }
 
     headers = {
@@ -618,7 +636,7 @@ def fetch_dgidb_drugs_via_graphql(genes):
         resp = requests.post(
             DGIDB_GRAPHQL_URL,
             headers=headers,
-            data=json.dumps(payload),
+            json=payload,
             timeout=30,
         )
     except Exception as e:
@@ -646,46 +664,82 @@ def fetch_dgidb_drugs_via_graphql(genes):
     root = data.get("data", {}).get("genes", {})
     nodes = root.get("nodes", []) or []
 
-    gene_to_drugs = {}
+    # DGIdb preserves the order of input genes, so nodes align with
+    # chunk_genes; enumerate carries the index instead of the former
+    # nodes.index() linear scan per interaction
+    gene_to_drugs = {g: [] for g in chunk_genes}
 
-    for gene_node in nodes:
-        interactions = gene_node.get("interactions", []) or []
+    for gene_index, gene_node in enumerate(nodes):
+        if gene_index >= len(chunk_genes):
+            break
+        gene_name = chunk_genes[gene_index].upper()
+        bucket = gene_to_drugs.setdefault(gene_name, [])
 
-        for inter in interactions:
+        for inter in gene_node.get("interactions", []) or []:
             drug = inter.get("drug") or {}
             drug_name = drug.get("name")
-            concept_id = drug.get("conceptId")
 
             if not drug_name:
                 continue
 
-            # Determine gene by conceptId mapping (DGIdb nodes array is ordered same as input genes)
-            # We need to match back to gene names:
-            # So we iterate in same order `unique_genes`
-            for gene in unique_genes:
-                if gene not in gene_to_drugs:
-                    gene_to_drugs[gene] = []
-
-            # Find the gene by matching interaction list index
-            # DGIdb preserves order of input genes, so nodes align
-            gene_index = nodes.index(gene_node)
-            if gene_index < len(unique_genes):
-                gene_name = unique_genes[gene_index].upper()
-            else:
-                continue
-
-            gene_to_drugs[gene_name].append({
+            bucket.append({
                 "drug_name": drug_name,
-                "concept_id": concept_id,
+                "concept_id": drug.get("conceptId"),
                 "score": inter.get("interactionScore"),
                 "types": [t.get("type") for t in inter.get("interactionTypes", [])],
                 "publications": [p.get("pmid") for p in inter.get("publications", [])],
                 "sources": [s.get("sourceDbName") for s in inter.get("sources", [])],
             })
 
+    # Error paths above return {} uncached so transient failures retry
+    cache.set(cache_key, gene_to_drugs, DGIDB_CACHE_TTL)
     return gene_to_drugs
 
 
+def fetch_dgidb_drugs_via_graphql(genes):
+    """
+    Query DGIdb GraphQL API for drug-gene interactions.
+
+    Large gene sets are split into chunks fetched on a thread pool, so
+    wall-clock is bounded by the slowest shard instead of one monolithic
+    round-trip (and per-chunk cache entries stay reusable).
+
+    Returns:
+        dict: {
+            "GENE": [
+                {
+                  "drug_name": "...",
+                  "concept_id": "...",
+                  "score": ...,
+                  "types": [...],
+                  "publications": [...],
+                  "sources": [...],
+                },
+                ...
+            ]
+        }
+    """
+    if not genes:
+        return {}
+
+    # Normalized, unique gene names
+    unique_genes = sorted({str(g).strip() for g in genes if str(g).strip()})
+    if not unique_genes:
+        return {}
+
+    chunks = [
+        unique_genes[i:i + DGIDB_CHUNK_SIZE]
+        for i in range(0, len(unique_genes), DGIDB_CHUNK_SIZE)
+    ]
+    if len(chunks) == 1:
+        return _fetch_dgidb_chunk(chunks[0])
+
+    gene_to_drugs = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(chunks))) as pool:
+        for chunk_result in pool.map(_fetch_dgidb_chunk, chunks):
+            gene_to_drugs.update(chunk_result)
+    return gene_to_drugs
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -739,55 +793,95 @@ def drug_repurposing_engine(request):
             tgt_col = df.columns[1]
             weight_col = df.columns[2] if df.shape[1] > 2 else None
 
-            G = nx.Graph()
-
-            for _, row in df.iterrows():
-                src = str(row[src_col]).strip()
-                tgt = str(row[tgt_col]).strip()
-
-                if not src or not tgt or src == 'nan' or tgt == 'nan':
-                    continue
+            # Column-wise edge construction: iterrows boxes every cell into
+            # a Python scalar, which dominates ingest for large PPI files
+            src_names = df[src_col].astype(str).str.strip().to_numpy()
+            tgt_names = df[tgt_col].astype(str).str.strip().to_numpy()
+            valid = (
+                (src_names != '') & (src_names != 'nan')
+                & (tgt_names != '') & (tgt_names != 'nan')
+            )
 
-                if weight_col is not None:
-                    try:
-                        weight = float(row[weight_col])
-                    except (ValueError, TypeError):
-                        weight = 1.0
-                    G.add_edge(src, tgt, weight=weight)
-                else:
-                    G.add_edge(src, tgt)
+            G = nx.Graph()
+            if weight_col is not None:
+                # to_numeric(errors='coerce') + fillna fuses the per-row
+                # try/except float() into one vectorized pass
+                weights = (
+                    pd.to_numeric(df[weight_col], errors='coerce')
+                    .fillna(1.0)
+                    .to_numpy(dtype=np.float64)
+                )
+                G.add_weighted_edges_from(
+                    zip(src_names[valid], tgt_names[valid], weights[valid])
+                )
+            else:
+                G.add_edges_from(zip(src_names[valid], tgt_names[valid]))
 
             # --- BFS from biomarkers ---
             max_hops = 2  # you can parameterise this later if needed
             candidates_map = {}  # node -> best candidate info
             subgraph_nodes = set()
 
-            for biomarker in biomarkers:
-                if biomarker not in G:
-                    continue
-
-                subgraph_nodes.add(biomarker)
+            seed_names = [b for b in biomarkers if b in G]
+            if seed_names:
+                nodes_list = list(G.nodes())
+                name_to_idx = {n: i for i, n in enumerate(nodes_list)}
+                A = nx.to_scipy_sparse_array(G, nodelist=nodes_list)
+                seed_cols = np.fromiter(
+                    (name_to_idx[b] for b in seed_names), dtype=np.int64
+                )
 
-                lengths = nx.single_source_shortest_path_length(G, biomarker, cutoff=max_hops)
+                # k-hop reachability by repeated sparse products: for the
+                # 2-hop cutoff this is two SpGEMM passes over contiguous
+                # CSR data, and each node records the first (shortest) hop
+                # it is reached at — no full all-distances BFS needed
+                A_bool = A.astype(bool)
+                reach = A_bool[seed_cols, :]
+                dist_matrix = np.full(
+                    (len(seed_names), A.shape[0]), np.inf, dtype=np.float64
+                )
+                for hop in range(1, max_hops + 1):
+                    r, c = reach.nonzero()
+                    unseen = dist_matrix[r, c] == np.inf
+                    dist_matrix[r[unseen], c[unseen]] = float(hop)
+                    if hop < max_hops:
+                        reach = (reach @ A_bool).astype(bool)
+
+                subgraph_nodes.update(seed_names)
+
+                # Mask each seed's distance to itself (reached through a
+                # 2-hop cycle) so a biomarker can still surface as a
+                # candidate of a different biomarker
+                dist_matrix[np.arange(len(seed_names)), seed_cols] = np.inf
+
+                # One reduction over the seed axis replaces the former
+                # per-(seed, node) Python loop: each node keeps its nearest
+                # biomarker, which is exactly the best-score winner
+                if _nearest_seed is not None:
+                    best_seed, best_dist = _nearest_seed(dist_matrix)
+                else:
+                    best_seed = dist_matrix.argmin(axis=0)
+                    best_dist = dist_matrix[
+                        best_seed, np.arange(dist_matrix.shape[1])
+                    ]
 
-                for node, dist in lengths.items():
+                for j in np.nonzero(best_dist <= max_hops)[0]:
+                    node = nodes_list[j]
                     subgraph_nodes.add(node)
-                    if node == biomarker:
-                        continue
 
+                    dist = int(best_dist[j])
+                    biomarker = seed_names[int(best_seed[j])]
                     # simple scoring: closer nodes get higher scores
                     score = 1.0 / (dist + 1e-6)
 
-                    existing = candidates_map.get(node)
-                    if existing is None or score > existing['score']:
-                        candidates_map[node] = {
-                            'drug_name': None,  # will be filled after DGIdb query
-                            'target': node,
-                            'nearest_biomarker': biomarker,
-                            'hops_from_biomarker': dist,
-                            'score': score,
-                            'evidence': f'Nearest biomarker: {biomarker}, shortest path length: {dist}'
-                        }
+                    candidates_map[node] = {
+                        'drug_name': None,  # will be filled after DGIdb query
+                        'target': node,
+                        'nearest_biomarker': biomarker,
+                        'hops_from_biomarker': dist,
+                        'score': score,
+                        'evidence': f'Nearest biomarker: {biomarker}, shortest path length: {dist}'
+                    }
 
             # --- Enrich candidate targets with DGIdb drug info ---
             MAX_DRUGS_PER_TARGET = 3
@@ -815,25 +909,43 @@ def drug_repurposing_engine(request):
                 info['drug_count'] = len(simple_names)
                 info['drug_details'] = drugs_info
 
-            # Build subgraph (only nodes within cutoff hops from any biomarker)
-            H = G.subgraph(subgraph_nodes).copy()
-
-            node_list = []
-            for n in H.nodes():
-                node_list.append({
-                    'id': n,
-                    'label': n,
-                    'is_biomarker': n in biomarkers,
-                    'degree': int(H.degree(n))
-                })
-
-            edge_list = []
-            for u, v, data in H.edges(data=True):
-                edge_list.append({
-                    'source': u,
-                    'target': v,
-                    'weight': float(data.get('weight', 1.0))
-                })
+            # Build the subgraph payload straight off the CSR adjacency:
+            # one slice plus a COO pass, instead of materializing a
+            # NetworkX subgraph copy and walking its dict-of-dicts twice
+            if seed_names and subgraph_nodes:
+                biomarker_set = set(biomarkers)
+                sub_names = sorted(subgraph_nodes)
+                idx = np.fromiter(
+                    (name_to_idx[n] for n in sub_names), dtype=np.int64
+                )
+                sub = A[idx, :][:, idx].tocsr()
+
+                # Row lengths of the CSR slice are exactly the degrees
+                node_list = [
+                    {
+                        'id': n,
+                        'label': n,
+                        'is_biomarker': n in biomarker_set,
+                        'degree': int(d)
+                    }
+                    for n, d in zip(sub_names, np.diff(sub.indptr))
+                ]
+
+                coo = sub.tocoo()
+                upper = coo.row < coo.col  # each undirected edge once
+                edge_list = [
+                    {
+                        'source': sub_names[i],
+                        'target': sub_names[j],
+                        'weight': float(w)
+                    }
+                    for i, j, w in zip(
+                        coo.row[upper], coo.col[upper], coo.data[upper]
+                    )
+                ]
+            else:
+                node_list = []
+                edge_list = []
 
             candidates = sorted(
                 candidates_map.values(),
@@ -855,7 +967,9 @@ def drug_repurposing_engine(request):
                 'candidates': candidates
             }
 
-            return JsonResponse(response_data)
+            # node/edge/candidate lists can run to tens of thousands of
+            # dicts; orjson serializes them at C speed
+            return _json_response(response_data)
 
         finally:
             if os.path.exists(full_path):